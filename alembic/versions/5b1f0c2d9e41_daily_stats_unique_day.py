@@ -0,0 +1,52 @@
+"""Make daily_stats one row per day with severity and watermark columns
+
+Revision ID: 5b1f0c2d9e41
+Revises: cee4120a174b
+Create Date: 2025-08-02 10:12:44.120391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c2d9e41'
+down_revision: Union[str, Sequence[str], None] = 'cee4120a174b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Collapse the duplicate rows the old task kept inserting, keeping the latest per day
+    op.execute("""
+        DELETE FROM daily_stats a
+        USING daily_stats b
+        WHERE a.date::date = b.date::date AND a.id < b.id
+    """)
+    op.alter_column('daily_stats', 'date', type_=sa.Date(), postgresql_using='date::date', existing_nullable=False)
+    op.create_unique_constraint('uq_daily_stats_date', 'daily_stats', ['date'])
+
+    op.add_column('daily_stats', sa.Column('low_count', sa.Integer(), nullable=True))
+    op.add_column('daily_stats', sa.Column('medium_count', sa.Integer(), nullable=True))
+    op.add_column('daily_stats', sa.Column('high_count', sa.Integer(), nullable=True))
+    op.add_column('daily_stats', sa.Column('critical_count', sa.Integer(), nullable=True))
+    op.add_column('daily_stats', sa.Column('total_count', sa.Integer(), nullable=True))
+    op.add_column('daily_stats', sa.Column('source_updated_at', sa.DateTime(), nullable=True))
+    op.add_column('daily_stats', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('daily_stats', 'updated_at')
+    op.drop_column('daily_stats', 'source_updated_at')
+    op.drop_column('daily_stats', 'total_count')
+    op.drop_column('daily_stats', 'critical_count')
+    op.drop_column('daily_stats', 'high_count')
+    op.drop_column('daily_stats', 'medium_count')
+    op.drop_column('daily_stats', 'low_count')
+
+    op.drop_constraint('uq_daily_stats_date', 'daily_stats', type_='unique')
+    op.alter_column('daily_stats', 'date', type_=sa.DateTime(), existing_nullable=False)
@@ -0,0 +1,50 @@
+"""Create issue_counters table
+
+Revision ID: 8d3a6e7f1c20
+Revises: 5b1f0c2d9e41
+Create Date: 2025-08-05 16:40:02.518733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3a6e7f1c20'
+down_revision: Union[str, Sequence[str], None] = '5b1f0c2d9e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('issue_counters',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM('OPEN', 'TRIAGED', 'IN_PROGRESS', 'DONE', name='issuestatus', create_type=False), nullable=False),
+    sa.Column('severity', postgresql.ENUM('LOW', 'MEDIUM', 'HIGH', 'CRITICAL', name='issueseverity', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('owner_id', 'status', 'severity')
+    )
+
+    # Seed the counters from the existing issues: per owner, then the global scope (owner_id = 0)
+    op.execute("""
+        INSERT INTO issue_counters (owner_id, status, severity, count)
+        SELECT owner_id, COALESCE(status, 'OPEN'), COALESCE(severity, 'MEDIUM'), count(*)
+        FROM issues
+        WHERE owner_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    op.execute("""
+        INSERT INTO issue_counters (owner_id, status, severity, count)
+        SELECT 0, COALESCE(status, 'OPEN'), COALESCE(severity, 'MEDIUM'), count(*)
+        FROM issues
+        GROUP BY 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('issue_counters')
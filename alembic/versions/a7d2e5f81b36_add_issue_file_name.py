@@ -0,0 +1,37 @@
+"""Add file_name to issues and issues_archive for attachment reference lookups
+
+Revision ID: a7d2e5f81b36
+Revises: f3b9d2c47e15
+Create Date: 2025-08-26 14:11:42.907315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d2e5f81b36'
+down_revision: Union[str, Sequence[str], None] = 'f3b9d2c47e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('issues', 'issues_archive'):
+        op.add_column(table, sa.Column('file_name', sa.String(), nullable=True))
+        # The basename of the stored path, whatever UPLOAD_DIR it was written under
+        op.execute(
+            f"UPDATE {table} SET file_name = regexp_replace(file_path, '^.*/', '') "
+            "WHERE file_path IS NOT NULL"
+        )
+        op.create_index(op.f(f'ix_{table}_file_name'), table, ['file_name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('issues_archive', 'issues'):
+        op.drop_index(op.f(f'ix_{table}_file_name'), table_name=table)
+        op.drop_column(table, 'file_name')
@@ -0,0 +1,54 @@
+"""Create weekly_stats and monthly_stats rollup tables
+
+Revision ID: b27c94e0a5f3
+Revises: 8d3a6e7f1c20
+Create Date: 2025-08-09 11:03:27.904416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b27c94e0a5f3'
+down_revision: Union[str, Sequence[str], None] = '8d3a6e7f1c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rollup_columns():
+    return [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('days', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('open_count', sa.Integer(), nullable=True),
+        sa.Column('triaged_count', sa.Integer(), nullable=True),
+        sa.Column('in_progress_count', sa.Integer(), nullable=True),
+        sa.Column('done_count', sa.Integer(), nullable=True),
+        sa.Column('low_count', sa.Integer(), nullable=True),
+        sa.Column('medium_count', sa.Integer(), nullable=True),
+        sa.Column('high_count', sa.Integer(), nullable=True),
+        sa.Column('critical_count', sa.Integer(), nullable=True),
+        sa.Column('total_count', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('period_start'),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('weekly_stats', *_rollup_columns())
+    op.create_index(op.f('ix_weekly_stats_id'), 'weekly_stats', ['id'], unique=False)
+    op.create_table('monthly_stats', *_rollup_columns())
+    op.create_index(op.f('ix_monthly_stats_id'), 'monthly_stats', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_monthly_stats_id'), table_name='monthly_stats')
+    op.drop_table('monthly_stats')
+    op.drop_index(op.f('ix_weekly_stats_id'), table_name='weekly_stats')
+    op.drop_table('weekly_stats')
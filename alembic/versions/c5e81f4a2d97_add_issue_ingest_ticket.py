@@ -0,0 +1,30 @@
+"""Add a unique ingest_ticket to issues so replayed ingestion batches are idempotent
+
+Revision ID: c5e81f4a2d97
+Revises: a7d2e5f81b36
+Create Date: 2025-08-27 09:48:03.216554
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e81f4a2d97'
+down_revision: Union[str, Sequence[str], None] = 'a7d2e5f81b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('issues', sa.Column('ingest_ticket', sa.String(), nullable=True))
+    op.create_index(op.f('ix_issues_ingest_ticket'), 'issues', ['ingest_ticket'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_issues_ingest_ticket'), table_name='issues')
+    op.drop_column('issues', 'ingest_ticket')
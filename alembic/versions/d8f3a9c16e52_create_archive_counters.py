@@ -0,0 +1,50 @@
+"""Create archive_counters so stats stop rescanning issues_archive
+
+Revision ID: d8f3a9c16e52
+Revises: c5e81f4a2d97
+Create Date: 2025-08-28 11:20:37.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f3a9c16e52'
+down_revision: Union[str, Sequence[str], None] = 'c5e81f4a2d97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('archive_counters',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM('OPEN', 'TRIAGED', 'IN_PROGRESS', 'DONE', name='issuestatus', create_type=False), nullable=False),
+    sa.Column('severity', postgresql.ENUM('LOW', 'MEDIUM', 'HIGH', 'CRITICAL', name='issueseverity', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('owner_id', 'status', 'severity')
+    )
+
+    # Seed from the issues archived so far: per owner, then the global scope (owner_id = 0)
+    op.execute("""
+        INSERT INTO archive_counters (owner_id, status, severity, count)
+        SELECT owner_id, COALESCE(status, 'OPEN'), COALESCE(severity, 'MEDIUM'), count(*)
+        FROM issues_archive
+        WHERE owner_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    op.execute("""
+        INSERT INTO archive_counters (owner_id, status, severity, count)
+        SELECT 0, COALESCE(status, 'OPEN'), COALESCE(severity, 'MEDIUM'), count(*)
+        FROM issues_archive
+        GROUP BY 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('archive_counters')
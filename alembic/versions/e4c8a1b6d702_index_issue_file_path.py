@@ -0,0 +1,28 @@
+"""Index issues.file_path for attachment reference lookups
+
+Revision ID: e4c8a1b6d702
+Revises: b27c94e0a5f3
+Create Date: 2025-08-12 09:27:51.337640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c8a1b6d702'
+down_revision: Union[str, Sequence[str], None] = 'b27c94e0a5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_issues_file_path'), 'issues', ['file_path'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_issues_file_path'), table_name='issues')
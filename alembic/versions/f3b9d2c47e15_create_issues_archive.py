@@ -0,0 +1,50 @@
+"""Create issues_archive for long-closed issues
+
+Revision ID: f3b9d2c47e15
+Revises: e4c8a1b6d702
+Create Date: 2025-08-19 10:02:14.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d2c47e15'
+down_revision: Union[str, Sequence[str], None] = 'e4c8a1b6d702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('issues_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('status', postgresql.ENUM('OPEN', 'TRIAGED', 'IN_PROGRESS', 'DONE', name='issuestatus', create_type=False), nullable=True),
+    sa.Column('severity', postgresql.ENUM('LOW', 'MEDIUM', 'HIGH', 'CRITICAL', name='issueseverity', create_type=False), nullable=True),
+    sa.Column('file_path', sa.String(), nullable=True),
+    sa.Column('tags', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_issues_archive_file_path'), 'issues_archive', ['file_path'], unique=False)
+    op.create_index(op.f('ix_issues_archive_owner_id'), 'issues_archive', ['owner_id'], unique=False)
+    # Finds archive candidates without scanning open work
+    op.create_index('ix_issues_status_updated_at', 'issues', ['status', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_issues_status_updated_at', table_name='issues')
+    op.drop_index(op.f('ix_issues_archive_owner_id'), table_name='issues_archive')
+    op.drop_index(op.f('ix_issues_archive_file_path'), table_name='issues_archive')
+    op.drop_table('issues_archive')
@@ -0,0 +1,60 @@
+import logging
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import DateTime, delete, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core import counters
+from app.models.models import ArchiveCounter, ArchivedIssue, Issue, IssueStatus
+
+logger = logging.getLogger(__name__)
+
+# Columns copied from `issues` into `issues_archive`, which adds archived_at
+ARCHIVED_COLUMNS = [
+    "id", "title", "description", "status", "severity", "file_path", "file_name", "tags",
+    "created_at", "updated_at", "owner_id",
+]
+
+
+def all_issues(*columns: str):
+    """
+    `issues` UNION ALL `issues_archive` over the named columns, as a subquery.
+    For history rebuilds; recurring counts read the archive totals instead.
+    """
+    return union_all(
+        select(*[getattr(Issue, column) for column in columns]),
+        select(*[getattr(ArchivedIssue, column) for column in columns]),
+    ).subquery("all_issues")
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> List[Tuple[int, int]]:
+    """
+    Moves up to `batch_size` DONE issues last updated before `cutoff` into the
+    archive with one INSERT ... SELECT and one DELETE. On PostgreSQL the rows
+    are locked first, skipping any a concurrent request is updating.
+    The rows bypass the ORM, so the live counters keep counting them; the
+    archive totals (archive_counters) are updated in the same transaction.
+    Returns the (id, owner_id) of the moved issues. The caller commits.
+    """
+    candidates = (
+        select(Issue.id, Issue.owner_id, Issue.status, Issue.severity)
+        .where(Issue.status == IssueStatus.DONE, Issue.updated_at < cutoff)
+        .order_by(Issue.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+    rows = db.execute(candidates).all()
+    if not rows:
+        return []
+
+    ids = [row.id for row in rows]
+    copied = select(
+        *[getattr(Issue, column) for column in ARCHIVED_COLUMNS],
+        literal(datetime.utcnow(), DateTime()),
+    ).where(Issue.id.in_(ids))
+    db.execute(insert(ArchivedIssue).from_select(ARCHIVED_COLUMNS + ["archived_at"], copied))
+    db.execute(delete(Issue).where(Issue.id.in_(ids)), execution_options={"synchronize_session": False})
+    counters.apply_deltas(db, counters.deltas_for_rows(row._asdict() for row in rows), ArchiveCounter)
+    return [(row.id, row.owner_id) for row in rows]
@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import string
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from app.models.models import ArchivedIssue, Issue
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint of an unfinished GC run, kept next to the files it describes
+STATE_FILE = ".gc_state.json"
+
+# Uploads are named <uuid4><ext>, so the first hex digit splits them into
+# stable shards; a run checkpoints after each shard and resumes from there.
+OTHER_SHARD = "other"
+SHARDS = list("0123456789abcdef") + [OTHER_SHARD]
+
+
+def _shard_of(name: str) -> str:
+    first = name[0].lower()
+    return first if first in string.hexdigits.lower() else OTHER_SHARD
+
+
+def _load_state(upload_dir: Path) -> Dict:
+    try:
+        with open(upload_dir / STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(upload_dir: Path, state: Dict) -> None:
+    tmp = upload_dir / f"{STATE_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, upload_dir / STATE_FILE)
+
+
+def _sweep(db: Session, upload_dir: Path, names: List[str], cutoff: float, state: Dict) -> None:
+    """
+    Deletes the files in `names` that no issue, live or archived, references and that are older than `cutoff`.
+    References are matched on the stored basename, not the full path, which depends on how UPLOAD_DIR was
+    spelled when the file was uploaded.
+    """
+    referenced = set()
+    for model in (Issue, ArchivedIssue):
+        referenced.update(
+            file_name for (file_name,) in
+            db.query(model.file_name).filter(model.file_name.in_(names))
+        )
+    for name in names:
+        if name in referenced:
+            continue
+        path = upload_dir / name
+        # Only unreferenced files pay for a stat call
+        try:
+            st = os.stat(path, follow_symlinks=False)
+            if st.st_mtime > cutoff:
+                continue
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.error(f"Error deleting file {name}: {e}")
+            continue
+        state["deleted"] += 1
+        state["bytes_reclaimed"] += st.st_size
+        logger.info(f"Deleted orphaned file: {name}")
+
+
+def collect_orphans(db: Session, upload_dir: Path, grace_seconds: float, batch_size: int = 500) -> Dict:
+    """
+    Deletes uploaded files that no issue references and that are older than the
+    grace period. The directory is listed once and its entries bucketed by
+    shard; each shard is checked against the file_name of issues and
+    archived issues in batches, and progress is checkpointed so an
+    interrupted run resumes at the first unfinished shard.
+    Returns the run totals.
+    """
+    state = _load_state(upload_dir)
+    resumed = bool(state)
+    if not resumed:
+        state = {"started_at": time.time(), "done_shards": [], "scanned": 0, "deleted": 0, "bytes_reclaimed": 0}
+    cutoff = state["started_at"] - grace_seconds
+
+    # One directory listing per run, bucketed by shard
+    pending = {shard: [] for shard in SHARDS if shard not in state["done_shards"]}
+    with os.scandir(upload_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            names = pending.get(_shard_of(entry.name))
+            if names is not None and entry.is_file(follow_symlinks=False):
+                names.append(entry.name)
+
+    for shard, names in pending.items():
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            _sweep(db, upload_dir, batch, cutoff, state)
+            state["scanned"] += len(batch)
+        state["done_shards"].append(shard)
+        _save_state(upload_dir, state)
+
+    os.remove(upload_dir / STATE_FILE)
+    return {
+        "scanned": state["scanned"],
+        "deleted": state["deleted"],
+        "bytes_reclaimed": state["bytes_reclaimed"],
+        "resumed": resumed,
+    }
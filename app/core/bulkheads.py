@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import config
+from app.core.metrics import BULKHEAD_IN_USE, BULKHEAD_QUEUED, BULKHEAD_REJECTED, UNMATCHED_ROUTE, route_template
+from app.core.route_groups import parse_group_settings, route_group
+
+logger = logging.getLogger(__name__)
+
+
+class Bulkhead:
+    """
+    Caps the requests of one route group running at once. Excess requests
+    wait in a bounded FIFO queue for up to `queue_timeout` seconds and are
+    rejected when the queue is full or the wait runs out, so a burst in one
+    group cannot take every threadpool thread from the others.
+    """
+
+    def __init__(self, group: str, limit: int, max_queue: int, queue_timeout: float):
+        self.group = group
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_use = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self) -> bool:
+        """Takes a slot, waiting if needed; False means the request should be rejected."""
+        if self.in_use < self.limit and not self._waiters:
+            self._take()
+            return True
+        if len(self._waiters) >= self.max_queue:
+            BULKHEAD_REJECTED.labels(self.group, "queue_full").inc()
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        BULKHEAD_QUEUED.labels(self.group).inc()
+        try:
+            # release() hands its slot straight to the first waiter
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            BULKHEAD_REJECTED.labels(self.group, "timeout").inc()
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            BULKHEAD_QUEUED.labels(self.group).dec()
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_use -= 1
+        BULKHEAD_IN_USE.labels(self.group).dec()
+
+    def _take(self) -> None:
+        self.in_use += 1
+        BULKHEAD_IN_USE.labels(self.group).inc()
+
+    def stats(self) -> Dict:
+        return {"limit": self.limit, "in_use": self.in_use, "queued": len(self._waiters)}
+
+
+def build_bulkheads(limits: Dict[str, float], max_queue: int, queue_timeout: float) -> Dict[str, Bulkhead]:
+    """One bulkhead per group with a positive limit; other groups are not capped."""
+    return {
+        group: Bulkhead(group, int(limit), max_queue, queue_timeout)
+        for group, limit in limits.items()
+        if limit > 0
+    }
+
+
+bulkheads = build_bulkheads(
+    parse_group_settings(config.BULKHEAD_LIMITS, 0),
+    config.BULKHEAD_MAX_QUEUE,
+    config.BULKHEAD_QUEUE_TIMEOUT_SECONDS,
+)
+
+
+class BulkheadMiddleware:
+    """Runs each request inside its route group's bulkhead; rejections are 503 with Retry-After."""
+
+    def __init__(self, app: ASGIApp, groups: Optional[Dict[str, Bulkhead]] = None):
+        self.app = app
+        self.bulkheads = bulkheads if groups is None else groups
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.bulkheads:
+            await self.app(scope, receive, send)
+            return
+
+        template = route_template(scope["app"], scope) if "app" in scope else UNMATCHED_ROUTE
+        bulkhead = self.bulkheads.get(route_group(scope["method"], template))
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await bulkhead.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "The server is busy with similar requests, retry shortly"},
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release()
+
+
+class ThreadpoolStats:
+    """Size and saturation of the threadpool running sync routes and dependencies."""
+
+    def __init__(self):
+        self.limiter = None
+
+    def configure(self, size: int) -> None:
+        # The default limiter belongs to the running event loop, so this runs at startup
+        self.limiter = anyio.to_thread.current_default_thread_limiter()
+        if size > 0:
+            self.limiter.total_tokens = size
+        logger.info(f"Threadpool size: {self.limiter.total_tokens}")
+
+    def stats(self) -> Dict:
+        if self.limiter is None:
+            return {}
+        return {
+            "size": self.limiter.total_tokens,
+            "in_use": self.limiter.borrowed_tokens,
+            "waiting": self.limiter.statistics().tasks_waiting,
+        }
+
+
+threadpool = ThreadpoolStats()
@@ -1,9 +1,108 @@
 # app/core/config.py
+import os
 
 # IMPORTANT: Change SECRET_KEY to a strong, random string in production!
 SECRET_KEY = "your-super-secret-key-replace-me"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(60)# Token expires in 60 minutes
 
+# Redis is shared by Celery, the ingestion queue and other runtime helpers
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+
+# Write-behind ingestion for automated reporters
+INGEST_QUEUE_MAX_LENGTH = int(os.getenv("INGEST_QUEUE_MAX_LENGTH", "50000"))  # Reject with 503 above this
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))  # Rows per multi-row INSERT
+INGEST_TICKET_TTL_SECONDS = int(os.getenv("INGEST_TICKET_TTL_SECONDS", "86400"))  # How long ticket status is kept
+INGEST_DRAIN_INTERVAL_SECONDS = float(os.getenv("INGEST_DRAIN_INTERVAL_SECONDS", "5"))
+
+# Trend rollups and daily stats retention
+STATS_ROLLUP_LOOKBACK_DAYS = int(os.getenv("STATS_ROLLUP_LOOKBACK_DAYS", "7"))  # Buckets refreshed on each run
+DAILY_STATS_RETENTION_DAYS = int(os.getenv("DAILY_STATS_RETENTION_DAYS", "400"))  # Older days survive only as rollups
+
+# Attachment storage and orphan collection
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+ORPHAN_GRACE_HOURS = float(os.getenv("ORPHAN_GRACE_HOURS", "24"))  # Unreferenced files younger than this are kept
+ATTACHMENT_GC_BATCH_SIZE = int(os.getenv("ATTACHMENT_GC_BATCH_SIZE", "500"))  # Paths per reference lookup
+
+# Hot/cold split: DONE issues untouched this long move to issues_archive in committed batches
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))  # Rows per INSERT ... SELECT / DELETE
+ARCHIVE_MAX_BATCHES = int(os.getenv("ARCHIVE_MAX_BATCHES", "100"))  # Per run; the next run continues
+
+# Celery prefork workers: each child process opens its own small pool and is recycled periodically
+WORKER_DB_POOL_SIZE = int(os.getenv("WORKER_DB_POOL_SIZE", "2"))
+WORKER_DB_MAX_OVERFLOW = int(os.getenv("WORKER_DB_MAX_OVERFLOW", "2"))
+WORKER_PREFETCH_MULTIPLIER = int(os.getenv("WORKER_PREFETCH_MULTIPLIER", "1"))  # Long tasks: don't hoard messages
+WORKER_MAX_TASKS_PER_CHILD = int(os.getenv("WORKER_MAX_TASKS_PER_CHILD", "1000"))
+WORKER_MAX_MEMORY_PER_CHILD_KB = int(os.getenv("WORKER_MAX_MEMORY_PER_CHILD_KB", str(512 * 1024)))
+
+# Result cache for issue lists and dashboard stats: "memory" (per process), "redis" (shared) or "none"
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")
+# Where the memory backend keeps its invalidation generations: "redis" (every API worker and
+# Celery task sees every write) or "local" (only safe when a single process serves and writes)
+RESULT_CACHE_GENERATIONS = os.getenv("RESULT_CACHE_GENERATIONS", "redis")
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "30"))  # Bounds staleness while Redis is unreachable
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Issue list read path: "core" (row tuples encoded with orjson) or "orm" (models + Pydantic)
+ISSUE_READ_PATH = os.getenv("ISSUE_READ_PATH", "core")
+
+# Response compression (br/zstd are used when their packages are installed)
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))  # Smaller complete bodies are sent as-is
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Per-request SQL profiling: query count and DB time in a Server-Timing header
+SQL_PROFILING = os.getenv("SQL_PROFILING", "false").lower() in ("1", "true", "yes")
+SQL_PROFILING_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILING_REPEAT_THRESHOLD", "10"))  # Warn about N+1 above this
+
+# On-demand sampling profiler (admin only)
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_MAX_HZ = int(os.getenv("PROFILER_MAX_HZ", "250"))
+
+# Opt-in allocation tracking with tracemalloc (adds per-allocation overhead while on)
+MEMORY_DIAGNOSTICS = os.getenv("MEMORY_DIAGNOSTICS", "false").lower() in ("1", "true", "yes")
+MEMORY_DIAGNOSTICS_SAMPLE_RATE = float(os.getenv("MEMORY_DIAGNOSTICS_SAMPLE_RATE", "0.05"))  # Share of requests measured
+MEMORY_DIAGNOSTICS_FRAMES = int(os.getenv("MEMORY_DIAGNOSTICS_FRAMES", "10"))  # Traceback depth per allocation
+MEMORY_SNAPSHOT_LIMIT = int(os.getenv("MEMORY_SNAPSHOT_LIMIT", "8"))  # Oldest snapshots are dropped beyond this
+
+# Boot: "create" (ensure enums/tables), "check" (require the Alembic head) or
+# "migrate" (upgrade to head under an advisory lock, one process at a time)
+STARTUP_SCHEMA_MODE = os.getenv("STARTUP_SCHEMA_MODE", "create")
+STARTUP_POOL_PREWARM = int(os.getenv("STARTUP_POOL_PREWARM", "5"))  # Connections opened before serving; 0 disables
+
+# Read replicas for read-only routes (comma-separated SQLAlchemy URLs; empty = primary only)
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))  # Lagging replicas are skipped; 0 disables
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))  # Writers read from the primary this long
+READ_PIN_BACKEND = os.getenv("READ_PIN_BACKEND", "memory")  # "memory" (per process) or "redis" (shared)
+
+# PostgreSQL statement_timeout per route group (see app/core/route_groups.py), in ms; 0 disables
+STATEMENT_TIMEOUT_DEFAULT_MS = float(os.getenv("STATEMENT_TIMEOUT_DEFAULT_MS", "30000"))
+STATEMENT_TIMEOUTS_MS = os.getenv("STATEMENT_TIMEOUTS_MS", "list=10000,detail=5000,dashboard=5000,auth=5000")
+
+# Token bucket rate limits per caller and route group: "memory" (per process), "redis" (shared) or "none".
+# Defaults are role=rate/burst in requests per second for every group; overrides are role.group=rate/burst
+# with * for every role. A rate of 0 leaves that role or group unlimited.
+# Off by default: anonymous callers are keyed by client address, so behind a reverse proxy set
+# RATE_LIMIT_TRUSTED_PROXIES first or every anonymous caller shares the proxy's bucket.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "none")
+RATE_LIMIT_DEFAULTS = os.getenv("RATE_LIMIT_DEFAULTS", "anonymous=20/100,reporter=20/200,maintainer=50/500,admin=0")
+RATE_LIMIT_OVERRIDES = os.getenv("RATE_LIMIT_OVERRIDES", "*.upload=5/50")
+# Comma-separated proxy addresses or CIDRs whose X-Forwarded-For is believed, e.g. "10.0.0.0/8,127.0.0.1"
+RATE_LIMIT_TRUSTED_PROXIES = [p.strip() for p in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if p.strip()]
+
+# Concurrency caps per route group so one slow class of endpoint cannot take every thread; groups
+# not listed are uncapped. Waiting requests queue up to BULKHEAD_MAX_QUEUE per group and are
+# rejected with 503 after BULKHEAD_QUEUE_TIMEOUT_SECONDS.
+BULKHEAD_LIMITS = os.getenv("BULKHEAD_LIMITS", "upload=6,ingest=4,write=10,dashboard=6,list=10")
+BULKHEAD_MAX_QUEUE = int(os.getenv("BULKHEAD_MAX_QUEUE", "50"))
+BULKHEAD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT_SECONDS", "5"))
+# Threads for sync routes and dependencies; 0 keeps AnyIO's default of 40
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "0"))
+
 # You can add other configuration variables here as needed
-# For example, database settings could also be defined here if not using environment variables directly
\ No newline at end of file
+# For example, database settings could also be defined here if not using environment variables directly
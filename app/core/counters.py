@@ -0,0 +1,146 @@
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.database.database import dialect_insert
+from app.models.models import ArchiveCounter, Issue, IssueCounter, IssueStatus, IssueSeverity
+
+logger = logging.getLogger(__name__)
+
+# owner_id of the counter rows that hold totals across all owners
+GLOBAL_SCOPE = 0
+
+CounterKey = Tuple[int, IssueStatus, IssueSeverity]
+
+
+def _keys(owner_id: Optional[int], issue_status, severity) -> Iterable[CounterKey]:
+    issue_status = issue_status or IssueStatus.OPEN
+    severity = severity or IssueSeverity.MEDIUM
+    yield GLOBAL_SCOPE, issue_status, severity
+    if owner_id is not None:
+        yield owner_id, issue_status, severity
+
+
+def _previous(state, attr: str):
+    """Value of `attr` before the pending change, or the current value if unchanged."""
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, attr)
+
+
+def apply_deltas(db: Session, deltas: Dict[CounterKey, int], table=IssueCounter) -> None:
+    """
+    Adds deltas to the counter rows (of `table`, issue_counters or
+    archive_counters) with one multi-row upsert. Rows are sorted so
+    concurrent writers lock them in the same order.
+    """
+    rows = [
+        {"owner_id": owner_id, "status": issue_status, "severity": severity, "count": delta}
+        for (owner_id, issue_status, severity), delta in sorted(deltas.items(), key=lambda item: (item[0][0], item[0][1].value, item[0][2].value))
+        if delta
+    ]
+    if not rows:
+        return
+    insert = dialect_insert(db.get_bind())
+    stmt = insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.owner_id, table.status, table.severity],
+        set_={"count": table.count + stmt.excluded.count},
+    )
+    db.connection().execute(stmt)
+
+
+def deltas_for_rows(rows: Iterable[dict], sign: int = 1) -> Dict[CounterKey, int]:
+    """Counter deltas for issue rows written outside the ORM unit of work."""
+    deltas: Dict[CounterKey, int] = Counter()
+    for row in rows:
+        for key in _keys(row.get("owner_id"), row.get("status"), row.get("severity")):
+            deltas[key] += sign
+    return deltas
+
+
+@event.listens_for(Session, "before_flush")
+def _track_issue_changes(session: Session, flush_context, instances) -> None:
+    deltas: Dict[CounterKey, int] = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, Issue):
+            for key in _keys(obj.owner_id, obj.status, obj.severity):
+                deltas[key] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Issue):
+            state = inspect(obj)
+            for key in _keys(_previous(state, "owner_id"), _previous(state, "status"), _previous(state, "severity")):
+                deltas[key] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Issue) and session.is_modified(obj, include_collections=False):
+            state = inspect(obj)
+            old = (_previous(state, "owner_id"), _previous(state, "status"), _previous(state, "severity"))
+            new = (obj.owner_id, obj.status, obj.severity)
+            if old != new:
+                for key in _keys(*old):
+                    deltas[key] -= 1
+                for key in _keys(*new):
+                    deltas[key] += 1
+
+    apply_deltas(session, deltas)
+
+
+def read_counters(db: Session, owner_id: int = GLOBAL_SCOPE, table=IssueCounter) -> Dict[Tuple[IssueStatus, IssueSeverity], int]:
+    """Returns the (status, severity) -> count map for one scope, live by default or of the archive."""
+    rows = (
+        db.query(table.status, table.severity, table.count)
+        .filter(table.owner_id == owner_id)
+        .all()
+    )
+    return {(issue_status, severity): n for issue_status, severity, n in rows}
+
+
+def reconcile_counters(db: Session) -> int:
+    """
+    Recomputes every counter from the issues and the archive totals and corrects drift.
+    Takes no lock, so issue writes are never blocked by the recount. The recount
+    and the stored counters are read from one snapshot (REPEATABLE READ on
+    PostgreSQL); since every writer changes its rows and their counters in the
+    same transaction, the difference is pure drift, and it is applied as an
+    increment in a fresh transaction, on top of whatever committed since.
+    Call it with no transaction in progress: the snapshot is rolled back first.
+    Returns the number of corrected rows. The caller commits.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    actual: Dict[CounterKey, int] = Counter()
+    rows = (
+        db.query(Issue.owner_id, Issue.status, Issue.severity, func.count(Issue.id))
+        .group_by(Issue.owner_id, Issue.status, Issue.severity)
+        .all()
+    )
+    for owner_id, issue_status, severity, n in rows:
+        for key in _keys(owner_id, issue_status, severity):
+            actual[key] += n
+    # Archived issues never change, so their maintained totals stand in for a rescan
+    for c in db.query(ArchiveCounter).all():
+        actual[(c.owner_id, c.status, c.severity)] += c.count
+
+    stored = {
+        (c.owner_id, c.status, c.severity): c.count
+        for c in db.query(IssueCounter).all()
+    }
+    corrections = {
+        key: actual.get(key, 0) - stored.get(key, 0)
+        for key in set(actual) | set(stored)
+        if actual.get(key, 0) != stored.get(key, 0)
+    }
+    # End the read-only snapshot; the corrections are increments, valid in any later transaction
+    db.rollback()
+    if corrections:
+        logger.warning(f"Correcting {len(corrections)} drifted issue counters")
+        apply_deltas(db, corrections)
+    return len(corrections)
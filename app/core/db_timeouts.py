@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import config
+from app.core.metrics import DB_QUERIES_CANCELLED, DB_TIMEOUTS, UNMATCHED_ROUTE, route_template
+from app.core.route_groups import parse_group_settings, route_group
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_TIMEOUTS_MS = parse_group_settings(config.STATEMENT_TIMEOUTS_MS, config.STATEMENT_TIMEOUT_DEFAULT_MS)
+
+# PostgreSQL's query_canceled, raised for statement_timeout and for cancel requests
+QUERY_CANCELED = "57014"
+
+
+class RequestQueries:
+    """The route group of one request and the DBAPI connections running its queries."""
+
+    def __init__(self, group: str, timeout_ms: float):
+        self.group = group
+        self.timeout_ms = int(timeout_ms)
+        self.disconnected = False
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def started(self, dbapi_connection) -> None:
+        with self._lock:
+            self._active.add(dbapi_connection)
+
+    def finished(self, dbapi_connection) -> None:
+        with self._lock:
+            self._active.discard(dbapi_connection)
+
+    def cancel_all(self) -> int:
+        """Asks the server to cancel every query still running for this request."""
+        with self._lock:
+            active = list(self._active)
+        for dbapi_connection in active:
+            # psycopg2 sends a cancel request; sqlite3 interrupts in-process
+            cancel = getattr(dbapi_connection, "cancel", None) or getattr(dbapi_connection, "interrupt", None)
+            if cancel is None:
+                continue
+            try:
+                cancel()
+            except Exception as e:
+                logger.warning(f"Could not cancel query: {e}")
+        return len(active)
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    state = _current.get()
+    if state is not None and state.timeout_ms > 0 and connection.dialect.name == "postgresql":
+        # SET LOCAL lasts until the transaction ends, so pooled connections stay clean
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {state.timeout_ms}")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _track_query_start(conn, cursor, statement, parameters, context, executemany):
+    state = _current.get()
+    if state is not None:
+        state.started(conn.connection.dbapi_connection)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _track_query_end(conn, cursor, statement, parameters, context, executemany):
+    state = _current.get()
+    if state is not None:
+        state.finished(conn.connection.dbapi_connection)
+
+
+@event.listens_for(Engine, "handle_error")
+def _track_query_error(context):
+    state = _current.get()
+    if state is not None and context.connection is not None and context.connection.connection is not None:
+        state.finished(context.connection.connection.dbapi_connection)
+
+
+def is_query_canceled(error: sa_exc.OperationalError) -> bool:
+    orig = error.orig
+    return getattr(orig, "pgcode", None) == QUERY_CANCELED or str(orig) == "interrupted"
+
+
+def cancelled_by_disconnect(error: BaseException) -> bool:
+    """True for the error of a query cancelled because this request's client went away."""
+    state = _current.get()
+    return (
+        state is not None and state.disconnected
+        and isinstance(error, sa_exc.OperationalError) and is_query_canceled(error)
+    )
+
+
+async def operational_error_handler(request: Request, error: sa_exc.OperationalError):
+    """Statement timeouts become 504; any other operational error stays a 500."""
+    if not is_query_canceled(error):
+        raise error
+    state = _current.get()
+    group = state.group if state is not None else "default"
+    kind = "cancelled" if state is not None and state.disconnected else "statement"
+    DB_TIMEOUTS.labels(kind, group).inc()
+    return JSONResponse(status_code=504, content={"detail": "The database query took too long and was cancelled"})
+
+
+async def pool_timeout_handler(request: Request, error: sa_exc.TimeoutError):
+    """No pooled connection became free in time: shed load with a 503."""
+    state = _current.get()
+    DB_TIMEOUTS.labels("pool", state.group if state is not None else "default").inc()
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The database is busy, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+class QueryGuardMiddleware:
+    """
+    Applies the route group's statement timeout to each request's
+    transactions and cancels its running queries if the client disconnects
+    before the response is complete.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        template = route_template(scope["app"], scope) if "app" in scope else UNMATCHED_ROUTE
+        group = route_group(scope["method"], template)
+        state = RequestQueries(group, STATEMENT_TIMEOUTS_MS[group])
+        token = _current.set(state)
+
+        # Pump the client's messages so a disconnect is seen even while the
+        # app is busy and not reading; the one-slot queue keeps backpressure.
+        messages: asyncio.Queue = asyncio.Queue(maxsize=1)
+        response_complete = False
+
+        async def pump() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    if not response_complete:
+                        state.disconnected = True
+                        cancelled = await run_in_threadpool(state.cancel_all)
+                        if cancelled:
+                            DB_QUERIES_CANCELLED.labels(group).inc(cancelled)
+                            logger.info(f"Client went away; cancelled {cancelled} queries of {scope['path']}")
+                    await messages.put(message)
+                    return
+                await messages.put(message)
+
+        async def wrapped_receive() -> Message:
+            return await messages.get()
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        pump_task = asyncio.create_task(pump())
+        try:
+            await self.app(scope, wrapped_receive, wrapped_send)
+        finally:
+            pump_task.cancel()
+            _current.reset(token)
@@ -40,6 +40,10 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Hand the connection back to the pool now: reads may be served by a
+    # replica, and writes check a connection out again when they need one
+    db.expunge(user)
+    db.rollback()
     return user
 
 def require_role(allowed_roles: List[UserRole]):
@@ -0,0 +1,118 @@
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import redis
+
+from app.core.config import INGEST_QUEUE_MAX_LENGTH, INGEST_TICKET_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Redis keys used by the write-behind ingestion pipeline
+QUEUE_KEY = "issues:ingest:queue"
+PROCESSING_KEY = "issues:ingest:processing"
+DRAIN_LOCK_KEY = "issues:ingest:drain-lock"
+TICKET_KEY = "issues:ingest:ticket:{ticket_id}"
+
+# Ticket states
+TICKET_QUEUED = "queued"
+TICKET_DONE = "done"
+TICKET_FAILED = "failed"
+
+# Atomically moves up to ARGV[1] items from the head of the queue to the
+# processing list, so a crashed drain can be replayed instead of losing rows.
+_CLAIM_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+"""
+
+
+class IngestQueueFull(Exception):
+    """Raised when the ingestion queue is above INGEST_QUEUE_MAX_LENGTH."""
+
+    def __init__(self, length: int):
+        super().__init__(f"Ingestion queue is full ({length} pending)")
+        self.length = length
+
+
+def _ticket_key(ticket_id: str) -> str:
+    return TICKET_KEY.format(ticket_id=ticket_id)
+
+
+def enqueue_issue(r: redis.Redis, issue_data: dict, owner_id: int) -> str:
+    """
+    Puts a validated issue on the ingestion queue and returns its ticket id.
+    Raises IngestQueueFull when the queue is too long to accept more work.
+    """
+    length = r.llen(QUEUE_KEY)
+    if length >= INGEST_QUEUE_MAX_LENGTH:
+        raise IngestQueueFull(length)
+
+    ticket_id = uuid.uuid4().hex
+    payload = {
+        "ticket_id": ticket_id,
+        "owner_id": owner_id,
+        "queued_at": datetime.utcnow().isoformat(),
+        **issue_data,
+    }
+    pipe = r.pipeline()
+    pipe.hset(_ticket_key(ticket_id), mapping={"status": TICKET_QUEUED, "owner_id": owner_id})
+    pipe.expire(_ticket_key(ticket_id), INGEST_TICKET_TTL_SECONDS)
+    pipe.rpush(QUEUE_KEY, json.dumps(payload))
+    pipe.execute()
+    return ticket_id
+
+
+def get_ticket(r: redis.Redis, ticket_id: str) -> Optional[Dict[str, str]]:
+    """Returns the stored ticket state, or None if it is unknown or expired."""
+    raw = r.hgetall(_ticket_key(ticket_id))
+    if not raw:
+        return None
+    return {key.decode(): value.decode() for key, value in raw.items()}
+
+
+def claim_batch(r: redis.Redis, size: int) -> List[dict]:
+    """Moves up to `size` queued payloads to the processing list and returns them."""
+    items = r.eval(_CLAIM_SCRIPT, 2, QUEUE_KEY, PROCESSING_KEY, size)
+    return [json.loads(item) for item in items]
+
+
+def pending_batch(r: redis.Redis) -> List[dict]:
+    """Returns payloads left in the processing list by an interrupted drain."""
+    return [json.loads(item) for item in r.lrange(PROCESSING_KEY, 0, -1)]
+
+
+def release_batch(r: redis.Redis) -> None:
+    """Clears the processing list once its rows are committed."""
+    r.delete(PROCESSING_KEY)
+
+
+def resolve_tickets(r: redis.Redis, issue_ids: Dict[str, int], errors: Dict[str, str]) -> None:
+    """Records the resulting issue id (or error) for each ticket in the batch."""
+    pipe = r.pipeline()
+    for ticket_id, issue_id in issue_ids.items():
+        pipe.hset(_ticket_key(ticket_id), mapping={"status": TICKET_DONE, "issue_id": issue_id})
+        pipe.expire(_ticket_key(ticket_id), INGEST_TICKET_TTL_SECONDS)
+    for ticket_id, error in errors.items():
+        pipe.hset(_ticket_key(ticket_id), mapping={"status": TICKET_FAILED, "error": error})
+        pipe.expire(_ticket_key(ticket_id), INGEST_TICKET_TTL_SECONDS)
+    pipe.execute()
+
+
+def already_resolved(r: redis.Redis, ticket_ids: List[str]) -> set:
+    """Returns the subset of tickets that already reached a final state."""
+    pipe = r.pipeline()
+    for ticket_id in ticket_ids:
+        pipe.hget(_ticket_key(ticket_id), "status")
+    states = pipe.execute()
+    return {
+        ticket_id
+        for ticket_id, state in zip(ticket_ids, states)
+        if state is not None and state.decode() in (TICKET_DONE, TICKET_FAILED)
+    }
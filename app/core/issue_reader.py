@@ -0,0 +1,102 @@
+from typing import Callable, List, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session, joinedload, load_only
+
+from app.models.models import ArchivedIssue, Issue, User
+from app.schemas.schemas import IssueResponse, UserResponse
+
+# Fields a client may request with ?fields=, in IssueResponse order
+ISSUE_FIELDS = list(IssueResponse.model_fields)
+OWNER_FIELDS = list(UserResponse.model_fields)
+OWNER_ID = OWNER_FIELDS.index("id")
+
+# Applies the caller's role and query-string filters to a Query or Select over a model (Issue or ArchivedIssue)
+Filters = Callable[[object, type], object]
+
+
+def render_json(content) -> bytes:
+    """Serializes exactly like the response_model path, for caching the bytes."""
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+# ORM path: Issue objects -> IssueResponse models -> JSON
+
+def project(query, fields: Optional[List[str]], model=Issue):
+    """Narrows the SELECT to the requested columns and eager-loads the owner only when asked for."""
+    if fields is None:
+        return query.options(joinedload(model.owner))
+    columns = [getattr(model, field) for field in fields if field != "owner"]
+    query = query.options(load_only(*columns) if columns else load_only(model.id))
+    if "owner" in fields:
+        query = query.options(joinedload(model.owner))
+    return query
+
+
+def serialize(issue: Issue, fields: Optional[List[str]]):
+    if fields is None:
+        return IssueResponse.model_validate(issue)
+    data = {field: getattr(issue, field) for field in fields if field != "owner"}
+    if "owner" in fields:
+        data["owner"] = UserResponse.model_validate(issue.owner)
+    return {field: data[field] for field in fields}
+
+
+def read_issues_orm(db: Session, filters: Filters, fields: Optional[List[str]], skip: int, limit: Optional[int]) -> bytes:
+    query = filters(db.query(Issue), Issue).order_by(Issue.id)
+    issues = project(query, fields).offset(skip).limit(limit).all()
+    return render_json([serialize(issue, fields) for issue in issues])
+
+
+# Core path: row tuples -> dicts -> orjson, no identity map or model validation
+
+def _select_issues(model, filters: Filters, issue_keys: List[str], with_owner: bool):
+    columns = [getattr(model, field) for field in issue_keys]
+    if with_owner:
+        columns += [getattr(User, field) for field in OWNER_FIELDS]
+    stmt = select(*columns).select_from(model)
+    if with_owner:
+        stmt = stmt.outerjoin(User, model.owner_id == User.id)
+    return filters(stmt, model)
+
+
+def read_issues_core(
+    db: Session, filters: Filters, fields: Optional[List[str]], skip: int, limit: Optional[int],
+    include_archived: bool = False,
+) -> bytes:
+    """
+    Produces the same bytes as read_issues_orm. Keys follow the schema order,
+    enums encode as their values and naive datetimes as ISO 8601, matching
+    FastAPI's JSONResponse rendering of the response models.
+    With `include_archived` the archive is merged in by id with UNION ALL.
+    """
+    fields = fields or ISSUE_FIELDS
+    issue_keys = [field for field in fields if field != "owner"]
+    with_owner = "owner" in fields
+
+    if include_archived:
+        # The trailing sort key is dropped by the row slicing below
+        merged = union_all(*[
+            _select_issues(model, filters, issue_keys, with_owner).add_columns(model.id.label("sort_id"))
+            for model in (Issue, ArchivedIssue)
+        ]).subquery()
+        stmt = select(merged).order_by(merged.c.sort_id).offset(skip).limit(limit)
+    else:
+        stmt = _select_issues(Issue, filters, issue_keys, with_owner).order_by(Issue.id).offset(skip).limit(limit)
+
+    split = len(issue_keys)
+    end = split + len(OWNER_FIELDS) if with_owner else split
+    rows = db.connection().execute(stmt)
+    if with_owner:
+        items = []
+        for row in rows:
+            item = dict(zip(issue_keys, row[:split]))
+            owner = row[split:end]
+            item["owner"] = dict(zip(OWNER_FIELDS, owner)) if owner[OWNER_ID] is not None else None
+            items.append(item)
+    else:
+        items = [dict(zip(issue_keys, row[:split])) for row in rows]
+    return orjson.dumps(items)
@@ -0,0 +1,136 @@
+import itertools
+import random
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Dict, List
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import config
+from app.core.metrics import UNMATCHED_ROUTE, route_template
+
+# Allocation sites inside the tracing machinery itself are noise
+_NOISE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class SnapshotNotFound(Exception):
+    pass
+
+
+def ensure_tracing() -> bool:
+    """Starts tracemalloc when MEMORY_DIAGNOSTICS is on; False while it is off."""
+    if not config.MEMORY_DIAGNOSTICS:
+        return False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(config.MEMORY_DIAGNOSTICS_FRAMES)
+    return True
+
+
+def _stat_dict(stat) -> Dict:
+    frame = stat.traceback[0]
+    return {
+        "site": f"{frame.filename}:{frame.lineno}",
+        "size_bytes": stat.size,
+        "count": stat.count,
+        "traceback": [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+    }
+
+
+class MemoryDiagnostics:
+    """
+    Per-route allocation totals from sampled requests, plus numbered
+    tracemalloc snapshots that can be diffed by allocation site.
+
+    tracemalloc counts every thread, so a sampled request's figures include
+    whatever ran concurrently; they are indicative, and averaged per route.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict] = {}
+        self._snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def record(self, route: str, net_bytes: int, peak_bytes: int) -> None:
+        with self._lock:
+            stats = self._routes.setdefault(route, {"samples": 0, "net_bytes_total": 0, "peak_bytes_max": 0})
+            stats["samples"] += 1
+            stats["net_bytes_total"] += net_bytes
+            stats["peak_bytes_max"] = max(stats["peak_bytes_max"], peak_bytes)
+
+    def routes(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                route: {**stats, "net_bytes_avg": stats["net_bytes_total"] / stats["samples"]}
+                for route, stats in sorted(self._routes.items())
+            }
+
+    def take_snapshot(self) -> Dict:
+        snapshot = tracemalloc.take_snapshot().filter_traces(_NOISE)
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self._snapshots[snapshot_id] = (time.time(), snapshot)
+            while len(self._snapshots) > config.MEMORY_SNAPSHOT_LIMIT:
+                self._snapshots.popitem(last=False)
+        return {"id": snapshot_id, "traced_bytes": current, "peak_bytes": peak}
+
+    def snapshots(self) -> List[Dict]:
+        with self._lock:
+            return [{"id": snapshot_id, "taken_at": taken_at} for snapshot_id, (taken_at, _) in self._snapshots.items()]
+
+    def _get(self, snapshot_id: int):
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise SnapshotNotFound(snapshot_id)
+        return entry[1]
+
+    def diff(self, old_id: int, new_id: int, group_by: str = "lineno", limit: int = 20) -> List[Dict]:
+        """Top allocation sites by growth between two snapshots."""
+        old, new = self._get(old_id), self._get(new_id)
+        diffs = new.compare_to(old, group_by)[:limit]
+        return [
+            {**_stat_dict(stat), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+            for stat in diffs
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._snapshots.clear()
+
+
+memory_diagnostics = MemoryDiagnostics()
+
+
+class MemoryDiagnosticsMiddleware:
+    """Measures net and peak traced memory for a sample of requests."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not ensure_tracing()
+            or random.random() >= config.MEMORY_DIAGNOSTICS_SAMPLE_RATE
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            route = route_template(scope["app"], scope) if "app" in scope else UNMATCHED_ROUTE
+            memory_diagnostics.record(route, after - before, max(peak - before, 0))
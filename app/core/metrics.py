@@ -0,0 +1,246 @@
+import logging
+import time
+from typing import Dict, Optional
+
+import redis
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Labels only ever carry route templates, HTTP methods, status codes, pool
+# names and task names, so the number of series stays bounded.
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method"],
+)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+DB_TIMEOUTS = Counter(
+    "db_timeouts_total",
+    "Requests failed by a statement timeout, a disconnect cancel or pool exhaustion",
+    ["kind", "group"],
+)
+DB_QUERIES_CANCELLED = Counter(
+    "db_queries_cancelled_total",
+    "Running queries cancelled because the client disconnected",
+    ["group"],
+)
+
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by the token bucket rate limiter",
+    ["role", "group"],
+)
+
+BULKHEAD_IN_USE = Gauge("bulkhead_in_use", "Requests running inside each route group's bulkhead", ["group"])
+BULKHEAD_QUEUED = Gauge("bulkhead_queued", "Requests waiting for a bulkhead slot", ["group"])
+BULKHEAD_REJECTED = Counter(
+    "bulkhead_rejected_total",
+    "Requests rejected with 503 because the bulkhead queue was full or the wait timed out",
+    ["group", "reason"],
+)
+
+STARTUP_PHASE_SECONDS = Gauge("startup_phase_seconds", "Duration of each boot phase", ["phase"])
+
+WEBSOCKET_CONNECTIONS = Gauge("websocket_connections", "Open WebSocket connections")
+WEBSOCKET_BROADCAST_SECONDS = Histogram(
+    "websocket_broadcast_seconds",
+    "Time to deliver one broadcast to every open WebSocket",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+WEBSOCKET_SEND_FAILURES = Counter("websocket_send_failures_total", "WebSocket sends that raised")
+
+
+def route_template(app: ASGIApp, scope: Scope) -> str:
+    """
+    The path template of the route that serves `scope`, e.g. /issues/{issue_id}.
+    Several middlewares need it, so it is resolved once and kept in the scope.
+    """
+    template = scope.get("route_template")
+    if template is None:
+        template = UNMATCHED_ROUTE
+        for route in getattr(app, "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = route.path
+                break
+        scope["route_template"] = template
+    return template
+
+
+class MetricsMiddleware:
+    """Records latency per route template and the number of requests in flight."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        began = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route = route_template(scope["app"], scope) if "app" in scope else UNMATCHED_ROUTE
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - began)
+
+
+class PoolCollector:
+    """Reports each QueuePool's size, checked-out and overflow connections at scrape time."""
+
+    def __init__(self, engines: Dict[str, object]):
+        self.engines = engines
+
+    def collect(self):
+        families = [
+            (GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["pool"]), "size"),
+            (GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out", labels=["pool"]), "checkedout"),
+            (GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["pool"]), "checkedin"),
+            (GaugeMetricFamily("db_pool_overflow", "Connections open beyond the pool size", labels=["pool"]), "overflow"),
+        ]
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue
+            for family, method in families:
+                family.add_metric([name], getattr(pool, method)())
+        for family, _ in families:
+            yield family
+
+
+# Celery tasks run in worker processes, so they record into a Redis hash that
+# the API's /metrics reads back. Field names are "<task>|<stat>".
+TASK_METRICS_KEY = "metrics:celery_tasks"
+TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+
+_task_started: Dict[str, float] = {}
+
+
+def task_started(task_id: str) -> None:
+    _task_started[task_id] = time.perf_counter()
+
+
+def task_finished(task_id: str, task_name: str, failed: bool) -> None:
+    # task_failure fires before task_postrun, so a failed run is recorded once
+    began = _task_started.pop(task_id, None)
+    if began is None and not failed:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        if began is not None:
+            duration = time.perf_counter() - began
+            pipe.hincrby(TASK_METRICS_KEY, f"{task_name}|count", 1)
+            pipe.hincrbyfloat(TASK_METRICS_KEY, f"{task_name}|sum", duration)
+            for bound in TASK_BUCKETS:
+                if duration <= bound:
+                    pipe.hincrby(TASK_METRICS_KEY, f"{task_name}|le={bound}", 1)
+        if failed:
+            pipe.hincrby(TASK_METRICS_KEY, f"{task_name}|failures", 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record task metrics for {task_name}: {e}")
+
+
+def task_retried(task_name: str) -> None:
+    try:
+        get_redis().hincrby(TASK_METRICS_KEY, f"{task_name}|retries", 1)
+    except redis.RedisError as e:
+        logger.warning(f"Could not record task retry for {task_name}: {e}")
+
+
+class CeleryTaskCollector:
+    """Exposes task durations, failures and retries recorded by the workers."""
+
+    def describe(self):
+        # Registration must not need Redis
+        return [
+            HistogramMetricFamily("celery_task_duration_seconds", "Celery task run time"),
+            CounterMetricFamily("celery_task_failures", "Celery task runs that raised"),
+            CounterMetricFamily("celery_task_retries", "Celery task runs that scheduled a retry"),
+        ]
+
+    def collect(self):
+        try:
+            raw = get_redis().hgetall(TASK_METRICS_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Could not read task metrics: {e}")
+            return
+        tasks: Dict[str, Dict[str, float]] = {}
+        for field, value in raw.items():
+            task, _, stat = field.decode().rpartition("|")
+            tasks.setdefault(task, {})[stat] = float(value)
+
+        durations = HistogramMetricFamily(
+            "celery_task_duration_seconds", "Celery task run time", labels=["task"]
+        )
+        failures = CounterMetricFamily("celery_task_failures", "Celery task runs that raised", labels=["task"])
+        retries = CounterMetricFamily("celery_task_retries", "Celery task runs that scheduled a retry", labels=["task"])
+        for task, stats in sorted(tasks.items()):
+            count = stats.get("count", 0)
+            buckets = [(str(bound), stats.get(f"le={bound}", 0)) for bound in TASK_BUCKETS]
+            buckets.append(("+Inf", count))
+            durations.add_metric([task], buckets, stats.get("sum", 0))
+            failures.add_metric([task], stats.get("failures", 0))
+            retries.add_metric([task], stats.get("retries", 0))
+        yield durations
+        yield failures
+        yield retries
+
+
+class StatsCollector:
+    """Turns a `stats()` dict of numbers into gauges, e.g. the result cache's."""
+
+    def __init__(self, prefix: str, source):
+        self.prefix = prefix
+        self.source = source
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        for key, value in self.source.stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                family = GaugeMetricFamily(f"{self.prefix}_{key}", f"{self.prefix} {key}")
+                family.add_metric([], value)
+                yield family
+
+
+def register_collector(collector, registry=REGISTRY) -> Optional[object]:
+    try:
+        registry.register(collector)
+    except ValueError:
+        # Already registered, e.g. when the app module is imported twice
+        return None
+    return collector
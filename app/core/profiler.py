@@ -0,0 +1,77 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profiling session is already running in this process."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    Periodically captures every thread's stack with sys._current_frames and
+    aggregates them into collapsed stacks ("root;...;leaf count" lines, the
+    input format of flamegraph.pl and speedscope). Sampling only reads frame
+    objects, so the cost is one pass over the live stacks per tick, paid by
+    the profiling thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, hz: int) -> Dict:
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            return self._sample(seconds, hz)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, hz: int) -> Dict:
+        me = threading.get_ident()
+        interval = 1.0 / hz
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        next_tick = time.monotonic()
+        while next_tick < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[_collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+            samples += 1
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()  # Fell behind: skip ticks rather than burst
+        return {"samples": samples, "stacks": stacks}
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+profiler = SamplingProfiler()
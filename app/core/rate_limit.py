@@ -0,0 +1,220 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import redis
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import config
+from app.core.metrics import RATE_LIMITED, UNMATCHED_ROUTE, route_template
+from app.core.redis_client import get_redis
+from app.core.request_identity import bearer_claims, client_address, parse_networks
+from app.core.route_groups import GROUPS, route_group
+from app.models.models import UserRole
+
+logger = logging.getLogger(__name__)
+
+# Callers without a valid token are limited per client address under this role
+ANONYMOUS = "anonymous"
+ROLES = [ANONYMOUS] + [role.value for role in UserRole]
+
+Limit = Tuple[float, float]  # (tokens per second, bucket capacity)
+
+
+def parse_limits(defaults: str, overrides: str) -> Dict[Tuple[str, str], Limit]:
+    """
+    Builds the (role, group) -> (rate, burst) table. `defaults` gives each
+    role's limit for every group ("reporter=10/20,..."); `overrides` refines
+    single groups ("reporter.list=2/10,*.upload=1/5", * meaning every role).
+    """
+    per_role: Dict[str, Limit] = {}
+    for item in filter(None, (part.strip() for part in defaults.split(","))):
+        role, _, limit = item.partition("=")
+        per_role[role.strip()] = _parse_limit(limit)
+    unknown = set(per_role) - set(ROLES)
+    if unknown:
+        raise ValueError(f"Unknown roles in rate limits: {', '.join(sorted(unknown))}")
+
+    table = {(role, group): per_role.get(role, (0.0, 0.0)) for role in ROLES for group in GROUPS}
+    for item in filter(None, (part.strip() for part in overrides.split(","))):
+        target, _, limit = item.partition("=")
+        role, _, group = target.strip().partition(".")
+        if group not in GROUPS or (role != "*" and role not in ROLES):
+            raise ValueError(f"Unknown rate limit target {target.strip()!r}")
+        for each in (ROLES if role == "*" else [role]):
+            table[(each, group)] = _parse_limit(limit)
+    return table
+
+
+def _parse_limit(value: str) -> Limit:
+    rate, _, burst = value.strip().partition("/")
+    return float(rate), float(burst or rate)
+
+
+class MemoryBuckets:
+    """
+    Per-process token buckets; each worker enforces the limit on its own.
+    Buckets are kept in least-recently-used order: buckets that have refilled
+    completely are dropped from the old end on every call (a full bucket is
+    the same as no bucket), and past `max_keys` the oldest is evicted, so
+    memory stays bounded however many callers there are.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> (tokens, last update, time the bucket is full again)
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Takes one token; returns 0 when allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            tokens, updated, _ = self._buckets.pop(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / rate
+
+    def _expire(self, now: float) -> None:
+        while self._buckets:
+            _, _, full_at = next(iter(self._buckets.values()))
+            if full_at > now:
+                return
+            self._buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# KEYS[1] bucket hash; ARGV rate, burst. Uses the Redis clock so every worker
+# shares one time base. Returns the wait in milliseconds, 0 when allowed.
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return wait
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker, updated atomically by a Lua script."""
+
+    name = "redis"
+    prefix = "rate-limit:"
+
+    def __init__(self):
+        self._script = None
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        if self._script is None:
+            self._script = get_redis().register_script(TAKE_SCRIPT)
+        return self._script(keys=[self.prefix + key], args=[rate, burst]) / 1000
+
+
+class RateLimiter:
+    def __init__(self, buckets, limits: Dict[Tuple[str, str], Limit]):
+        self.buckets = buckets
+        self.limits = limits
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.buckets is not None
+
+    def check(self, identity: str, role: str, group: str) -> float:
+        """Seconds the caller must wait, 0 if the request may proceed. Unlimited when rate is 0."""
+        rate, burst = self.limits.get((role, group), (0.0, 0.0))
+        if rate <= 0:
+            return 0.0
+        try:
+            return self.buckets.take(f"{identity}:{group}", rate, burst)
+        except redis.RedisError as e:
+            # Fail open: an unavailable limiter must not take the API down
+            self.errors += 1
+            logger.warning(f"Rate limiter unavailable: {e}")
+            return 0.0
+
+
+def _make_buckets(name: str):
+    if name == "memory":
+        return MemoryBuckets()
+    if name == "redis":
+        return RedisBuckets()
+    return None
+
+
+rate_limiter = RateLimiter(
+    _make_buckets(config.RATE_LIMIT_BACKEND),
+    parse_limits(config.RATE_LIMIT_DEFAULTS, config.RATE_LIMIT_OVERRIDES),
+)
+
+
+TRUSTED_PROXIES = parse_networks(config.RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def caller(scope: Scope, headers, proxies=TRUSTED_PROXIES) -> Tuple[str, str]:
+    """(identity, role): the token subject and role, or the client address for anonymous callers."""
+    claims = bearer_claims(headers)
+    if claims and claims.get("sub"):
+        role = claims.get("roles")
+        return f"user:{claims['sub']}", role if role in ROLES else UserRole.REPORTER.value
+    return f"ip:{client_address(scope, headers, proxies) or 'unknown'}", ANONYMOUS
+
+
+class RateLimitMiddleware:
+    """Rejects requests over the caller's token bucket for the route group with 429."""
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        template = route_template(scope["app"], scope) if "app" in scope else UNMATCHED_ROUTE
+        group = route_group(scope["method"], template)
+        identity, role = caller(scope, Headers(scope=scope))
+        if isinstance(self.limiter.buckets, RedisBuckets):
+            wait = await run_in_threadpool(self.limiter.check, identity, role, group)
+        else:
+            wait = self.limiter.check(identity, role, group)
+
+        if wait > 0:
+            RATE_LIMITED.labels(role, group).inc()
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,15 @@
+import redis
+
+from app.core.config import REDIS_URL
+
+_client = None
+
+def get_redis() -> redis.Redis:
+    """
+    Returns a process-wide Redis client. The connection pool is created lazily,
+    so importing this module never opens a socket.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_URL)
+    return _client
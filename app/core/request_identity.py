@@ -0,0 +1,54 @@
+import ipaddress
+from typing import List, Optional, Sequence, Union
+
+from jose import JWTError, jwt
+
+from app.core.config import SECRET_KEY, ALGORITHM
+
+
+def bearer_claims(headers) -> Optional[dict]:
+    """
+    Verified claims of the request's bearer token, or None. Used by
+    middleware that must identify the caller without a database lookup.
+    """
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(values: Sequence[str]) -> List[Network]:
+    return [ipaddress.ip_network(value, strict=False) for value in values]
+
+
+def _trusted(address: str, proxies: Sequence[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in proxies)
+
+
+def client_address(scope, headers, proxies: Sequence[Network]) -> Optional[str]:
+    """
+    The address of the client that made the request. When the peer is a
+    trusted proxy, X-Forwarded-For is walked from the right (the hops our
+    proxies appended) to the first address that is not itself a trusted
+    proxy; anything further left is client-supplied and ignored.
+    """
+    client = scope.get("client")
+    address = client[0] if client else None
+    if address is None or not proxies or not _trusted(address, proxies):
+        return address
+    forwarded = [hop.strip() for hop in ",".join(headers.getlist("x-forwarded-for")).split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        address = hop
+        if not _trusted(hop, proxies):
+            break
+    return address
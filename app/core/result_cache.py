@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+import redis
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    RESULT_CACHE_BACKEND, RESULT_CACHE_GENERATIONS, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_MAX_BYTES,
+)
+from app.core.redis_client import get_redis
+from app.core.singleflight import flights
+from app.models.models import Issue
+
+logger = logging.getLogger(__name__)
+
+# Every cached result belongs to one scope: "all" for results computed over
+# every issue (maintainers and admins) or "owner:<id>" for a reporter's own
+# issues. Keys embed the scope's generation, so bumping it invalidates every
+# result of that scope at once; stale entries then age out of the LRU/TTL.
+ALL_SCOPE = "all"
+
+
+def owner_scope(owner_id: int) -> str:
+    return f"owner:{owner_id}"
+
+
+class LocalGenerations:
+    """Scope generations seen only by this process; for single-process deployments."""
+
+    def __init__(self):
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, scope: str) -> int:
+        return self._generations.get(scope, 0)
+
+    def bump(self, scope: str) -> None:
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+
+class RedisGenerations:
+    """Scope generations shared through Redis, so a write in any process invalidates every cache."""
+
+    prefix = "result-cache:gen:"
+
+    def generation(self, scope: str) -> int:
+        value = get_redis().get(self.prefix + scope)
+        return int(value) if value else 0
+
+    def bump(self, scope: str) -> None:
+        get_redis().incr(self.prefix + scope)
+
+
+class MemoryBackend:
+    """
+    In-process LRU bounded by entry count and stored bytes. Entries are per
+    process but generations need not be: with RedisGenerations a commit in
+    another API worker or a Celery task still invalidates this process's
+    entries, at the cost of one Redis read per lookup.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float, generations=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generations = generations or LocalGenerations()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def generation(self, scope: str) -> int:
+        return self.generations.generation(scope)
+
+    def bump(self, scope: str) -> None:
+        self.generations.bump(scope)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(key) + len(value)
+
+    def info(self) -> dict:
+        return {"entries": len(self._entries), "memory_bytes": self._bytes, "evictions": self.evictions}
+
+
+class RedisBackend:
+    """Shared cache for multi-worker deployments; Redis evicts by TTL."""
+
+    name = "redis"
+    prefix = "result-cache:"
+
+    def __init__(self, ttl: float):
+        self.ttl = int(ttl)
+        self.generations = RedisGenerations()
+
+    def generation(self, scope: str) -> int:
+        return self.generations.generation(scope)
+
+    def bump(self, scope: str) -> None:
+        self.generations.bump(scope)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return get_redis().get(self.prefix + key)
+
+    def set(self, key: str, value: bytes) -> None:
+        get_redis().set(self.prefix + key, value, ex=self.ttl)
+
+    def info(self) -> dict:
+        memory = get_redis().info("memory")
+        return {"memory_bytes": memory.get("used_memory"), "maxmemory": memory.get("maxmemory")}
+
+
+class ResultCache:
+    """Caches serialized query results and tracks hit ratio."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def _digest(params: dict) -> str:
+        return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _key(self, namespace: str, scope: str, params: dict) -> str:
+        return f"{namespace}:{scope}:g{self.backend.generation(scope)}:{self._digest(params)}"
+
+    def get_or_compute(self, namespace: str, scope: str, params: dict, compute: Callable[[], bytes]) -> bytes:
+        """
+        Returns the cached result for (namespace, scope, params), computing and
+        storing it on a miss. Concurrent misses for the same key share one
+        computation. Backend failures degrade to computing directly.
+        """
+        if not self.enabled:
+            return flights.do(f"{namespace}:{scope}:{self._digest(params)}", compute)
+        try:
+            key = self._key(namespace, scope, params)
+            value = self.backend.get(key)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Result cache unavailable: {e}")
+            return compute()
+
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return flights.do(key, lambda: self._fill(key, compute))
+
+    def _fill(self, key: str, compute: Callable[[], bytes]) -> bytes:
+        value = compute()
+        try:
+            self.backend.set(key, value)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Result cache unavailable: {e}")
+        return value
+
+    def invalidate_owners(self, owner_ids: Iterable[Optional[int]]) -> None:
+        """Drops every cached result that could include issues of these owners."""
+        if not self.enabled:
+            return
+        scopes = {ALL_SCOPE} | {owner_scope(owner_id) for owner_id in owner_ids if owner_id is not None}
+        try:
+            for scope in scopes:
+                self.backend.bump(scope)
+            self.invalidations += 1
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Result cache invalidation failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": self.backend.name if self.enabled else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+        if self.enabled:
+            try:
+                stats.update(self.backend.info())
+            except redis.RedisError:
+                pass
+        return stats
+
+
+def _make_backend(name: str, generations: str = "redis"):
+    if name == "memory":
+        return MemoryBackend(
+            RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL_SECONDS,
+            RedisGenerations() if generations == "redis" else LocalGenerations(),
+        )
+    if name == "redis":
+        return RedisBackend(RESULT_CACHE_TTL_SECONDS)
+    return None
+
+
+result_cache = ResultCache(_make_backend(RESULT_CACHE_BACKEND, RESULT_CACHE_GENERATIONS))
+
+
+# Invalidation: collect the owners touched by each flush, bump on commit
+@event.listens_for(Session, "after_flush")
+def _collect_changed_owners(session: Session, flush_context) -> None:
+    owners = session.info.setdefault("result_cache_owners", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Issue):
+            owners.add(obj.owner_id)
+            owners.update(inspect(obj).attrs.owner_id.history.deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    owners = session.info.pop("result_cache_owners", None)
+    if owners:
+        result_cache.invalidate_owners(owners)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop("result_cache_owners", None)
@@ -0,0 +1,43 @@
+from typing import Dict, Tuple
+
+# Routes are grouped by cost profile so that limits (statement timeouts, rate
+# limits, concurrency caps) are configured per group rather than per path.
+# Anything not listed falls back by method: reads are "default", writes "write".
+ROUTE_GROUPS: Dict[Tuple[str, str], str] = {
+    ("GET", "/issues/"): "list",
+    ("GET", "/issues/{issue_id}"): "detail",
+    ("GET", "/issues/dashboard/stats"): "dashboard",
+    ("GET", "/issues/dashboard/trends"): "dashboard",
+    ("POST", "/issues/"): "upload",
+    ("POST", "/issues/ingest"): "ingest",
+    ("GET", "/issues/ingest/{ticket_id}"): "detail",
+    ("POST", "/users/register"): "auth",
+    ("POST", "/users/token"): "auth",
+}
+
+GROUPS = ("list", "detail", "dashboard", "upload", "ingest", "auth", "admin", "write", "default")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def route_group(method: str, template: str) -> str:
+    group = ROUTE_GROUPS.get((method, template))
+    if group is not None:
+        return group
+    if template.startswith("/admin"):
+        return "admin"
+    return "default" if method in SAFE_METHODS else "write"
+
+
+def parse_group_settings(value: str, default: float) -> Dict[str, float]:
+    """Parses "list=5000,dashboard=3000" into a value for every group."""
+    settings = {group: default for group in GROUPS}
+    for item in value.split(","):
+        name, _, number = item.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        if name not in settings:
+            raise ValueError(f"Unknown route group {name!r}; expected one of {', '.join(GROUPS)}")
+        settings[name] = float(number)
+    return settings
@@ -0,0 +1,82 @@
+import threading
+from typing import Callable, Dict, TypeVar
+
+from app.core.db_timeouts import cancelled_by_disconnect
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, callers arriving while it is in flight wait for and share its
+    result (or exception). Sync routes run on threadpool threads, so waiting
+    is a plain threading.Event.
+
+    `abandoned(error)` is evaluated in the leader's context; when it is true
+    the failure was specific to the leader's request, so waiting callers
+    start over (one of them becoming the new leader) instead of sharing it.
+    """
+
+    def __init__(self, abandoned: Callable[[BaseException], bool] = lambda error: False):
+        self.abandoned = abandoned
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.executed += 1
+                else:
+                    self.coalesced += 1
+            if leader:
+                return self._run(key, call, fn)
+            call.done.wait()
+            if not call.abandoned:
+                return self._result(call)
+
+    def _run(self, key: str, call: _Call, fn: Callable[[], T]) -> T:
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            call.abandoned = self.abandoned(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _result(self, call: _Call):
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> dict:
+        requests = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / requests if requests else 0.0,
+        }
+
+
+# Shared by the expensive read endpoints. A leader whose client hung up has
+# its queries cancelled; that must not turn into a 504 for everyone waiting.
+flights = SingleFlight(abandoned=cancelled_by_disconnect)
@@ -0,0 +1,94 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import config
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Statements executed while serving one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int):
+        """Statement shapes executed more than `threshold` times, most frequent first."""
+        return [(statement, n) for statement, n in self.statements.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+# Set per request by SQLProfilingMiddleware. Sync routes run in threadpool
+# threads that start from a copy of the request's context, so they see and
+# mutate the same QueryStats object.
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_profiling_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is None or not started:
+        return
+    # Parameters are bound separately, so the statement text is its shape
+    stats.record(statement, time.perf_counter() - started.pop())
+
+
+class SQLProfilingMiddleware:
+    """
+    When SQL_PROFILING is on, counts the queries each request runs, reports
+    them in a Server-Timing header and warns about likely N+1 patterns.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not config.SQL_PROFILING:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            for statement, n in stats.repeated(config.SQL_PROFILING_REPEAT_THRESHOLD):
+                logger.warning(
+                    f"Possible N+1: {scope['method']} {scope['path']} ran the same statement {n} times: "
+                    f"{' '.join(statement.split())[:200]}"
+                )
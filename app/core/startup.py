@@ -0,0 +1,148 @@
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.metrics import STARTUP_PHASE_SECONDS
+from app.models.models import Base, UserRole, IssueStatus, IssueSeverity
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# Session-level advisory lock held by whichever process is changing the schema
+SCHEMA_LOCK_KEY = 7_318_402_615
+
+STARTUP_MODES = ("create", "check", "migrate")
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at the Alembic head revision this code expects."""
+
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.attributes["configure_logger"] = False  # Keep the app's logging setup
+    if connection is not None:
+        cfg.attributes["connection"] = connection
+    return cfg
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection: Connection) -> Optional[str]:
+    revision = MigrationContext.configure(connection).get_current_revision()
+    connection.commit()
+    return revision
+
+
+@contextmanager
+def schema_lock(connection: Connection):
+    """Serializes schema changes across every process booting against this database."""
+    if connection.dialect.name != "postgresql":
+        yield
+        return
+    connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+    connection.commit()
+    try:
+        yield
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        connection.commit()
+
+
+def _create_enum_types(connection: Connection) -> None:
+    for type_name, enum in (("userrole", UserRole), ("issuestatus", IssueStatus), ("issueseverity", IssueSeverity)):
+        values = ", ".join(f"'{member.value}'" for member in enum)
+        connection.execute(text(f"""
+            DO $$ BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = '{type_name}') THEN
+                    CREATE TYPE {type_name} AS ENUM ({values});
+                END IF;
+            END $$;
+        """))
+    connection.commit()
+
+
+def create_schema(engine: Engine) -> None:
+    """Legacy boot: ensure enum types and tables exist, one process at a time."""
+    with engine.connect() as connection, schema_lock(connection):
+        if connection.dialect.name == "postgresql":
+            _create_enum_types(connection)
+        Base.metadata.create_all(bind=connection)
+        connection.commit()
+
+
+def check_schema(engine: Engine) -> None:
+    """Fails fast unless the database is already at the head revision."""
+    head = head_revision()
+    with engine.connect() as connection:
+        current = current_revision(connection)
+    if current != head:
+        raise SchemaOutOfDate(f"Database is at revision {current}, expected {head}; run `alembic upgrade head`")
+
+
+def migrate_schema(engine: Engine) -> bool:
+    """
+    Upgrades to head when needed. Processes that find the database current
+    skip the lock entirely; the rest queue on the advisory lock, and all but
+    the first find the work done when they get it. Returns True if this
+    process applied migrations.
+    """
+    head = head_revision()
+    with engine.connect() as connection:
+        if current_revision(connection) == head:
+            return False
+        with schema_lock(connection):
+            if current_revision(connection) == head:
+                return False
+            logger.info(f"Upgrading database schema to {head}")
+            command.upgrade(alembic_config(connection), "head")
+            connection.commit()
+            return True
+
+
+def prewarm_pool(engine: Engine, connections: int) -> int:
+    """Opens up to `connections` pooled connections so first requests skip the connect cost."""
+    held = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            held.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in held:
+            connection.close()
+    return len(held)
+
+
+def run_startup(engine: Engine, mode: str, prewarm: int) -> Dict[str, float]:
+    """Prepares the schema according to `mode` and warms the pool; returns seconds per phase."""
+    if mode not in STARTUP_MODES:
+        raise ValueError(f"Unknown startup mode {mode!r}; expected one of {', '.join(STARTUP_MODES)}")
+
+    timings: Dict[str, float] = {}
+
+    def phase(name: str, fn, *args):
+        began = time.perf_counter()
+        result = fn(*args)
+        timings[name] = time.perf_counter() - began
+        STARTUP_PHASE_SECONDS.labels(name).set(timings[name])
+        return result
+
+    schema = {"create": create_schema, "check": check_schema, "migrate": migrate_schema}[mode]
+    phase(f"schema_{mode}", schema, engine)
+    if prewarm > 0:
+        phase("pool_prewarm", prewarm_pool, engine, prewarm)
+    timings["total"] = sum(timings.values())
+    return timings
@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database.database import dialect_insert
+from app.models.models import DailyStats, WeeklyStats, MonthlyStats, StatsCountsMixin, IssueStatus, IssueSeverity
+
+# Count columns shared by daily stats and the rollup tables
+COUNT_COLUMNS = [name for name in vars(StatsCountsMixin) if name.endswith("_count")]
+
+
+def empty_counts() -> Dict[str, int]:
+    """A zero for every count column."""
+    return dict.fromkeys(COUNT_COLUMNS, 0)
+
+
+def add_counts(counts: Dict[str, int], issue_status: IssueStatus, severity: IssueSeverity, n: int) -> None:
+    """Adds `n` issues of one status and severity to a count-columns dict."""
+    counts[f"{issue_status.value}_count"] += n
+    counts[f"{severity.value}_count"] += n
+    counts["total_count"] += n
+
+ROLLUP_MODELS = {"week": WeeklyStats, "month": MonthlyStats}
+
+
+def period_start(day: date, granularity: str) -> date:
+    """First day of the bucket `day` falls into."""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def rollup(db: Session, since: date) -> int:
+    """
+    Rebuilds every weekly and monthly bucket from the one containing `since`
+    onwards. Each bucket holds the snapshot of its latest daily row.
+    Returns the number of buckets written. The caller commits.
+    """
+    first = period_start(period_start(since, "week"), "month")
+    days = (
+        db.query(DailyStats)
+        .filter(DailyStats.date >= first)
+        .order_by(DailyStats.date)
+        .all()
+    )
+
+    written = 0
+    insert = dialect_insert(db.get_bind())
+    now = datetime.utcnow()
+    for granularity, model in ROLLUP_MODELS.items():
+        buckets = {}
+        for row in days:
+            bucket = buckets.setdefault(period_start(row.date, granularity), {"days": 0})
+            bucket["days"] += 1
+            bucket.update({column: getattr(row, column) for column in COUNT_COLUMNS})  # rows are date-ordered
+        if not buckets:
+            continue
+
+        rows = [{"period_start": key, "updated_at": now, **values} for key, values in buckets.items()]
+        stmt = insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.period_start],
+            set_={column: stmt.excluded[column] for column in COUNT_COLUMNS + ["days", "updated_at"]},
+        )
+        db.execute(stmt)
+        written += len(rows)
+    return written
+
+
+def apply_retention(db: Session, keep_days: int, today: Optional[date] = None) -> int:
+    """
+    Downsamples daily rows older than `keep_days`: the affected weeks and months
+    are rolled up first, then the daily rows are deleted. The cutoff is aligned
+    to a month start so no month loses only part of its days.
+    Returns the number of deleted daily rows. The caller commits.
+    """
+    today = today or date.today()
+    cutoff = period_start(today - timedelta(days=keep_days), "month")
+    oldest = db.query(DailyStats.date).order_by(DailyStats.date).first()
+    if oldest is None or oldest.date >= cutoff:
+        return 0
+
+    rollup(db, oldest.date)
+    return db.query(DailyStats).filter(DailyStats.date < cutoff).delete(synchronize_session=False)
+
+
+def read_trend(db: Session, granularity: str, start: date, end: date) -> List[dict]:
+    """Returns the trend points of one granularity between two dates, oldest first."""
+    if granularity == "day":
+        key = DailyStats.date
+        query = db.query(DailyStats)
+    else:
+        model = ROLLUP_MODELS[granularity]
+        key = model.period_start
+        query = db.query(model)
+        start = period_start(start, granularity)
+
+    points = []
+    for row in query.filter(key >= start, key <= end).order_by(key):
+        point = {"period_start": getattr(row, key.key)}
+        point.update({column: getattr(row, column) or 0 for column in COUNT_COLUMNS})
+        points.append(point)
+    return points
@@ -2,6 +2,9 @@ from fastapi import WebSocket, WebSocketDisconnect
 from typing import List, Dict
 import json
 import logging
+import time
+
+from app.core.metrics import WEBSOCKET_BROADCAST_SECONDS, WEBSOCKET_CONNECTIONS, WEBSOCKET_SEND_FAILURES
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +21,8 @@ class ConnectionManager:
             if user_id not in self.user_connections:
                 self.user_connections[user_id] = []
             self.user_connections[user_id].append(websocket)
-        
+
+        WEBSOCKET_CONNECTIONS.set(len(self.active_connections))
         logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket, user_id: int = None):
@@ -30,7 +34,8 @@ class ConnectionManager:
                 self.user_connections[user_id].remove(websocket)
             if not self.user_connections[user_id]:
                 del self.user_connections[user_id]
-        
+
+        WEBSOCKET_CONNECTIONS.set(len(self.active_connections))
         logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
@@ -46,6 +51,7 @@ class ConnectionManager:
                 try:
                     await websocket.send_text(message)
                 except Exception as e:
+                    WEBSOCKET_SEND_FAILURES.inc()
                     logger.error(f"Error sending message to user {user_id}: {e}")
                     disconnected.append(websocket)
             
@@ -55,12 +61,15 @@ class ConnectionManager:
 
     async def broadcast(self, message: str):
         disconnected = []
-        for connection in self.active_connections:
+        began = time.perf_counter()
+        for connection in list(self.active_connections):
             try:
                 await connection.send_text(message)
             except Exception as e:
+                WEBSOCKET_SEND_FAILURES.inc()
                 logger.error(f"Error broadcasting message: {e}")
                 disconnected.append(connection)
+        WEBSOCKET_BROADCAST_SECONDS.observe(time.perf_counter() - began)
         
         # Remove disconnected websockets
         for ws in disconnected:
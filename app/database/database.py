@@ -1,6 +1,10 @@
 import os
+from fastapi import Depends, Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+
+from app.core.metrics import DB_POOL_CHECKOUT_SECONDS
+from app.database.replicas import choose_replica, replicas
 
 # Read environment variables
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -25,6 +29,41 @@ Base = declarative_base()
 def get_db():
     db = SessionLocal()
     try:
+        # Check the connection out up front so pool waits show up in metrics
+        with DB_POOL_CHECKOUT_SECONDS.time():
+            db.connection()
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency for read-only routes: a replica session when one is configured,
+# healthy and the caller has not written recently; the primary otherwise.
+# The primary fallback is the request's get_db session, the same one
+# get_current_user authenticated with, so a request never holds two primary
+# connections; on replica reads that session has already handed its
+# connection back.
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    replica = choose_replica(request)
+    db = replicas.open_session(replica) if replica is not None else None
+    if db is None:
+        yield primary
+        return
+    db.info["read_source"] = "replica"
+    try:
+        yield db
+    finally:
+        db.close()
+
+def read_source(db: Session) -> str:
+    """Where a get_read_db session reads from; part of cache keys so replica lag never leaks into primary reads."""
+    return db.info.get("read_source", "primary")
+
+# Dialect-specific INSERT so callers can use ON CONFLICT upserts
+def dialect_insert(bind):
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {bind.dialect.name}")
+    return insert
@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import redis
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import config
+from app.core.redis_client import get_redis
+from app.core.request_identity import bearer_claims
+
+logger = logging.getLogger(__name__)
+
+# Seconds since the replica last replayed a transaction; 0 on a primary
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+)
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.name = self.engine.url.render_as_string(hide_password=True)
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.checked_at = 0.0
+        self.checking = threading.Lock()
+
+
+class ReplicaRouter:
+    """
+    Round-robins reads over healthy replicas. Health (reachable, and lag
+    under the limit) is re-checked at most once per interval per replica, by
+    whichever request finds it stale; others use the last known state.
+    """
+
+    def __init__(self, urls: List[str], check_interval: float, max_lag: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._next = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def check(self, replica: Replica) -> None:
+        if not replica.checking.acquire(blocking=False):
+            return
+        try:
+            with replica.engine.connect() as connection:
+                lag = connection.execute(LAG_QUERY).scalar() if replica.engine.dialect.name == "postgresql" else 0.0
+            replica.lag_seconds = float(lag)
+            healthy = not self.max_lag or replica.lag_seconds <= self.max_lag
+            if healthy != replica.healthy:
+                logger.warning(f"Replica {replica.name} is {'healthy' if healthy else 'lagging'} ({lag:.1f}s)")
+            replica.healthy = healthy
+        except SQLAlchemyError as e:
+            if replica.healthy:
+                logger.warning(f"Replica {replica.name} is unreachable: {e}")
+            replica.healthy = False
+        finally:
+            replica.checked_at = time.monotonic()
+            replica.checking.release()
+
+    def mark_down(self, replica: Replica) -> None:
+        replica.healthy = False
+        replica.checked_at = time.monotonic()
+
+    def pick(self) -> Optional[Replica]:
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if now - replica.checked_at > self.check_interval:
+                self.check(replica)
+            if replica.healthy:
+                return replica
+        return None
+
+    def open_session(self, replica: Replica) -> Optional[Session]:
+        """A session with its connection already checked out, or None (and the replica marked down)."""
+        db = replica.sessions()
+        try:
+            db.connection()
+        except SQLAlchemyError as e:
+            db.close()
+            logger.warning(f"Replica {replica.name} failed, reading from the primary: {e}")
+            self.mark_down(replica)
+            return None
+        return db
+
+    def status(self) -> List[Dict]:
+        return [
+            {"replica": replica.name, "healthy": replica.healthy, "lag_seconds": replica.lag_seconds}
+            for replica in self.replicas
+        ]
+
+
+class ReadPins:
+    """
+    Read-your-writes: token subjects that wrote recently read from the
+    primary. "memory" pins are per process; "redis" pins hold across workers.
+    """
+
+    prefix = "read-pin:"
+
+    def __init__(self, backend: str, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._pins: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def pin(self, subject: str) -> None:
+        if self.backend == "redis":
+            try:
+                get_redis().set(self.prefix + subject, 1, px=int(self.ttl * 1000))
+            except redis.RedisError as e:
+                logger.warning(f"Could not pin {subject} to the primary: {e}")
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._pins[subject] = now + self.ttl
+            if len(self._pins) > 10_000:
+                self._pins = {key: expires for key, expires in self._pins.items() if expires > now}
+
+    def is_pinned(self, subject: str) -> bool:
+        if self.backend == "redis":
+            try:
+                return bool(get_redis().exists(self.prefix + subject))
+            except redis.RedisError:
+                return True  # Unknown: prefer the primary over a possibly stale read
+        return self._pins.get(subject, 0) > time.monotonic()
+
+
+def token_subject(headers) -> Optional[str]:
+    claims = bearer_claims(headers)
+    return claims.get("sub") if claims else None
+
+
+replicas = ReplicaRouter(config.DB_REPLICA_URLS, config.REPLICA_HEALTH_CHECK_SECONDS, config.REPLICA_MAX_LAG_SECONDS)
+read_pins = ReadPins(config.READ_PIN_BACKEND, config.READ_YOUR_WRITES_SECONDS)
+
+
+def choose_replica(request: Request) -> Optional[Replica]:
+    """The replica to read from for this request, or None for the primary."""
+    if not replicas.enabled:
+        return None
+    subject = token_subject(request.headers)
+    if subject is not None and read_pins.is_pinned(subject):
+        return None
+    return replicas.pick()
+
+
+class ReadYourWritesMiddleware:
+    """Pins the caller to the primary after any successful unsafe request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not replicas.enabled or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                subject = token_subject(Request(scope).headers)
+                if subject is not None:
+                    await run_in_threadpool(read_pins.pin, subject)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
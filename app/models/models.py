@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Date, DateTime, Enum, Index
+from sqlalchemy.orm import relationship, validates
 from app.database.database import Base
 from datetime import datetime
 import enum
+import os
 
 # Role enum
 class UserRole(str, enum.Enum):
@@ -46,22 +47,102 @@ class Issue(Base):
     description = Column(Text, nullable=True)
     status = Column(Enum(IssueStatus), default=IssueStatus.OPEN)
     severity = Column(Enum(IssueSeverity), default=IssueSeverity.MEDIUM)
-    file_path = Column(String, nullable=True)  # For file uploads
+    file_path = Column(String, nullable=True, index=True)  # For file uploads
+    # Basename of file_path; the attachment GC matches files on it, so moving
+    # UPLOAD_DIR does not orphan every stored path
+    file_name = Column(String, nullable=True, index=True)
     tags = Column(String, nullable=True)  # Comma-separated tags
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Ticket of the write-behind ingestion that created the issue; unique so a replayed batch inserts nothing twice
+    ingest_ticket = Column(String, nullable=True, unique=True, index=True)
 
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="issues")
 
-# Daily stats model for background jobs
-class DailyStats(Base):
-    __tablename__ = "daily_stats"
+    # Finds archive candidates without scanning open work
+    __table_args__ = (Index("ix_issues_status_updated_at", "status", "updated_at"),)
 
-    id = Column(Integer, primary_key=True, index=True)
-    date = Column(DateTime, nullable=False)
+    @validates("file_path")
+    def _set_file_name(self, key, file_path):
+        self.file_name = os.path.basename(file_path) if file_path else None
+        return file_path
+
+# Cold storage for long-closed issues, moved out of `issues` by the archive task.
+# Rows keep their issue id and are read-only; see app/core/archive.py.
+class ArchivedIssue(Base):
+    __tablename__ = "issues_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    status = Column(Enum(IssueStatus), default=IssueStatus.DONE)
+    severity = Column(Enum(IssueSeverity), default=IssueSeverity.MEDIUM)
+    file_path = Column(String, nullable=True, index=True)
+    file_name = Column(String, nullable=True, index=True)
+    tags = Column(String, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    owner = relationship("User", viewonly=True)
+
+# Issue counts shared by the daily stats and its weekly/monthly rollups
+class StatsCountsMixin:
     open_count = Column(Integer, default=0)
     triaged_count = Column(Integer, default=0)
     in_progress_count = Column(Integer, default=0)
     done_count = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    low_count = Column(Integer, default=0)
+    medium_count = Column(Integer, default=0)
+    high_count = Column(Integer, default=0)
+    critical_count = Column(Integer, default=0)
+    total_count = Column(Integer, default=0)
+
+# Daily stats model for background jobs
+class DailyStats(StatsCountsMixin, Base):
+    __tablename__ = "daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, nullable=False, unique=True)  # One row per day, upserted
+    source_updated_at = Column(DateTime, nullable=True)  # max(issues.updated_at) when aggregated
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Pre-rolled trend buckets; counts are the snapshot of the last day in the period
+class WeeklyStats(StatsCountsMixin, Base):
+    __tablename__ = "weekly_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    period_start = Column(Date, nullable=False, unique=True)  # Monday of the ISO week
+    days = Column(Integer, default=0)  # Daily rows the bucket was built from
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class MonthlyStats(StatsCountsMixin, Base):
+    __tablename__ = "monthly_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    period_start = Column(Date, nullable=False, unique=True)  # First day of the month
+    days = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Live issue counters maintained in the same transaction as issue writes
+class IssueCounter(Base):
+    __tablename__ = "issue_counters"
+
+    owner_id = Column(Integer, primary_key=True)  # 0 holds the totals across all owners
+    status = Column(Enum(IssueStatus), primary_key=True)
+    severity = Column(Enum(IssueSeverity), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+# Totals of issues_archive in the same shape as issue_counters. The archive is
+# append-only, so archive_batch keeps these exact and stats read them instead
+# of rescanning the archive.
+class ArchiveCounter(Base):
+    __tablename__ = "archive_counters"
+
+    owner_id = Column(Integer, primary_key=True)  # 0 holds the totals across all owners
+    status = Column(Enum(IssueStatus), primary_key=True)
+    severity = Column(Enum(IssueSeverity), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.models.models import User
+from app.core import config
+from app.core.dependencies import require_admin
+from app.core.profiler import ProfilerBusy, collapsed, profiler
+from app.database.replicas import replicas
+from app.core.memory_diagnostics import SnapshotNotFound, ensure_tracing, memory_diagnostics
+from app.core.result_cache import result_cache
+from app.core.singleflight import flights
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"]
+)
+
+
+@router.get("/cache/stats")
+def get_cache_stats(current_user: User = Depends(require_admin)):
+    """Hit ratio and memory usage of the issue list / dashboard result cache."""
+    return result_cache.stats()
+
+
+@router.get("/coalescing/stats")
+def get_coalescing_stats(current_user: User = Depends(require_admin)):
+    """How many identical concurrent reads shared one database computation."""
+    return flights.stats()
+
+
+@router.get("/replicas")
+def get_replica_status(current_user: User = Depends(require_admin)):
+    """Health and replication lag of the read replicas, as last checked."""
+    return replicas.status()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+def profile(
+    seconds: float = Query(10, gt=0, le=config.PROFILER_MAX_SECONDS),
+    hz: int = Query(100, ge=1, le=config.PROFILER_MAX_HZ),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Samples every thread's stack in this worker process for `seconds` at `hz`
+    and returns collapsed stacks for flamegraph tools. One session at a time.
+    """
+    try:
+        result = profiler.profile(seconds, hz)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    return PlainTextResponse(collapsed(result["stacks"]), headers={"X-Profile-Samples": str(result["samples"])})
+
+
+def _require_tracing() -> None:
+    if not ensure_tracing():
+        raise HTTPException(status_code=409, detail="Memory diagnostics are off (MEMORY_DIAGNOSTICS)")
+
+
+@router.get("/memory/routes")
+def get_memory_by_route(current_user: User = Depends(require_admin)):
+    """Net and peak traced allocation per route template, from sampled requests."""
+    _require_tracing()
+    return memory_diagnostics.routes()
+
+
+@router.post("/memory/snapshots")
+def take_memory_snapshot(current_user: User = Depends(require_admin)):
+    """Takes a tracemalloc snapshot of this worker process for later diffing."""
+    _require_tracing()
+    return memory_diagnostics.take_snapshot()
+
+
+@router.get("/memory/snapshots")
+def list_memory_snapshots(current_user: User = Depends(require_admin)):
+    return memory_diagnostics.snapshots()
+
+
+@router.get("/memory/diff")
+def diff_memory_snapshots(
+    old: int = Query(..., alias="from"),
+    new: int = Query(..., alias="to"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(require_admin)
+):
+    """Top allocation sites by growth from snapshot `from` to snapshot `to`."""
+    try:
+        return memory_diagnostics.diff(old, new, group_by, limit)
+    except SnapshotNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e} not found")
@@ -1,18 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.schemas.schemas import IssueCreate, IssueResponse, IssueUpdate, DashboardStats
-from app.models.models import Issue, User, UserRole, IssueStatus, IssueSeverity
-from app.database.database import get_db
+import redis
+from app.schemas.schemas import IssueCreate, IssueResponse, IssueUpdate, DashboardStats, DashboardTrends, TrendGranularity, IngestTicket, IngestTicketStatus
+from app.models.models import Issue, ArchivedIssue, User, UserRole, IssueStatus, IssueSeverity
+from app.database.database import get_db, get_read_db, read_source
 from typing import List, Optional
 from app.core.dependencies import get_current_user, require_role, require_maintainer_or_admin
+from app.core.redis_client import get_redis
+from app.core import config, conditional, ingest, counters, trends, issue_reader
+from app.core.result_cache import result_cache, owner_scope, ALL_SCOPE
 import os
 import uuid
+from datetime import date, timedelta
 from pathlib import Path
 
 router = APIRouter(prefix="/issues", tags=["Issues"])
 
 # File upload directory
-UPLOAD_DIR = Path("uploads")
+UPLOAD_DIR = Path(config.UPLOAD_DIR)
 UPLOAD_DIR.mkdir(exist_ok=True)
 
 @router.post("/", response_model=IssueResponse)
@@ -51,42 +57,177 @@ def create_issue(
     db.refresh(new_issue)
     return new_issue
 
-@router.get("/", response_model=List[IssueResponse])
-def get_issues(
-    status: Optional[IssueStatus] = None,
-    severity: Optional[IssueSeverity] = None,
-    db: Session = Depends(get_db),
+@router.post("/ingest", response_model=IngestTicket, status_code=status.HTTP_202_ACCEPTED)
+def ingest_issue(
+    issue: IssueCreate,
+    r: redis.Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Issue)
-    
+    """
+    Write-behind variant of create_issue for automated reporters. The issue is
+    validated and queued; a Celery task inserts queued issues in batches.
+    """
+    try:
+        ticket_id = ingest.enqueue_issue(r, issue.model_dump(mode="json"), current_user.id)
+    except ingest.IngestQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ingestion queue is full, retry later",
+            headers={"Retry-After": "30"},
+        )
+    except redis.RedisError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Ingestion queue unavailable")
+    return IngestTicket(ticket_id=ticket_id, status=ingest.TICKET_QUEUED)
+
+@router.get("/ingest/{ticket_id}", response_model=IngestTicketStatus)
+def get_ingest_ticket(
+    ticket_id: str,
+    r: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        ticket = ingest.get_ticket(r, ticket_id)
+    except redis.RedisError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Ingestion queue unavailable")
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+
+    # Check access rights
+    if current_user.role == UserRole.REPORTER and int(ticket["owner_id"]) != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    return IngestTicketStatus(
+        ticket_id=ticket_id,
+        status=ticket["status"],
+        issue_id=ticket.get("issue_id"),
+        error=ticket.get("error"),
+    )
+
+def _filter_issues(query, current_user: User, status: Optional[IssueStatus], severity: Optional[IssueSeverity], model=Issue):
     # Apply role-based filtering
     if current_user.role == UserRole.REPORTER:
-        query = query.filter(Issue.owner_id == current_user.id)
+        query = query.filter(model.owner_id == current_user.id)
     
     # Apply optional filters
     if status:
-        query = query.filter(Issue.status == status)
+        query = query.filter(model.status == status)
     if severity:
-        query = query.filter(Issue.severity == severity)
-    
-    return query.all()
+        query = query.filter(model.severity == severity)
+    return query
+
+def _list_scope(current_user: User) -> str:
+    return owner_scope(current_user.id) if current_user.role == UserRole.REPORTER else ALL_SCOPE
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validates ?fields=a,b,c against the whitelist; None means the full representation."""
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(issue_reader.ISSUE_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(sorted(unknown)) or '(empty)'}. Allowed: {', '.join(issue_reader.ISSUE_FIELDS)}"
+        )
+    return [field for field in issue_reader.ISSUE_FIELDS if field in requested]
+
+def _revalidation_row(db: Session, model, issue_id: int, with_owner: bool):
+    """(owner_id, updated_at[, owner fields...]) of one issue: what its ETag depends on."""
+    query = db.query(model.owner_id, model.updated_at)
+    if with_owner:
+        query = query.outerjoin(User, model.owner_id == User.id).add_columns(
+            *[getattr(User, field) for field in issue_reader.OWNER_FIELDS]
+        )
+    return query.filter(model.id == issue_id).first()
+
+@router.get("/", response_model=List[IssueResponse])
+def get_issues(
+    request: Request,
+    status: Optional[IssueStatus] = None,
+    severity: Optional[IssueSeverity] = None,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of issue fields to return"),
+    include_archived: bool = Query(False, description="Also list issues moved to the archive"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    scope = _list_scope(current_user)
+    selected = _parse_fields(fields)
+    filters = lambda query, model: _filter_issues(query, current_user, status, severity, model)
+
+    # ETag for the filtered list: newest change plus row count (catches deletes).
+    # No Last-Modified: deleting or archiving a row does not move max(updated_at),
+    # so If-Modified-Since alone would answer 304 for a list that lost rows.
+    last_modified, count = filters(db.query(func.max(Issue.updated_at), func.count(Issue.id)), Issue).one()
+    if include_archived:
+        archived_modified, archived_count = filters(
+            db.query(func.max(ArchivedIssue.updated_at), func.count(ArchivedIssue.id)), ArchivedIssue
+        ).one()
+        last_modified = max(filter(None, (last_modified, archived_modified)), default=None)
+        count += archived_count
+    etag = conditional.weak_etag("issues", scope, status, severity, skip, limit, selected, include_archived, last_modified, count)
+    if conditional.is_not_modified(request, etag, None):
+        return conditional.not_modified(etag, None)
+
+    def compute() -> bytes:
+        if include_archived:
+            # Only the Core reader can merge the archive in SQL; it renders the same bytes
+            return issue_reader.read_issues_core(db, filters, selected, skip, limit, include_archived=True)
+        read = issue_reader.read_issues_core if config.ISSUE_READ_PATH == "core" else issue_reader.read_issues_orm
+        return read(db, filters, selected, skip, limit)
+
+    # The ETag is part of the key, so a body is only ever served under the validators
+    # it was computed with, even before a commit's generation bump is visible
+    params = {
+        "status": status, "severity": severity, "skip": skip, "limit": limit, "fields": selected,
+        "source": read_source(db), "etag": etag,
+    }
+    if include_archived:
+        params["include_archived"] = True
+    body = result_cache.get_or_compute("issues", scope, params, compute)
+    return Response(content=body, media_type="application/json", headers=conditional.validator_headers(etag, None))
 
 @router.get("/{issue_id}", response_model=IssueResponse)
 def get_issue(
     issue_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of issue fields to return"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    issue = db.query(Issue).filter(Issue.id == issue_id).first()
-    if not issue:
+    selected = _parse_fields(fields)
+    with_owner = selected is None or "owner" in selected
+
+    # Cheap indexed lookup first, so revalidations never load the full row.
+    # Archived issues keep their id and updated_at, so their ETags stay valid.
+    model = Issue
+    current = _revalidation_row(db, Issue, issue_id, with_owner)
+    if not current:
+        model = ArchivedIssue
+        current = _revalidation_row(db, ArchivedIssue, issue_id, with_owner)
+    if not current:
         raise HTTPException(status_code=404, detail="Issue not found")
     
     # Check access rights
-    if current_user.role == UserRole.REPORTER and issue.owner_id != current_user.id:
+    if current_user.role == UserRole.REPORTER and current.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
-    
-    return issue
+
+    # The embedded owner has no updated_at of its own, so its fields go into the ETag
+    etag = conditional.weak_etag("issue", issue_id, selected, *current[1:])
+    if conditional.is_not_modified(request, etag, current.updated_at):
+        return conditional.not_modified(etag, current.updated_at)
+    conditional.set_validators(response, etag, current.updated_at)
+
+    issue = issue_reader.project(db.query(model), selected, model).filter(model.id == issue_id).first()
+    if selected is None:
+        return issue
+    return Response(
+        content=issue_reader.render_json(issue_reader.serialize(issue, selected)),
+        media_type="application/json",
+        headers=conditional.validator_headers(etag, current.updated_at),
+    )
 
 @router.put("/{issue_id}", response_model=IssueResponse)
 def update_issue(
@@ -137,38 +278,56 @@ def delete_issue(
 
 @router.get("/dashboard/stats", response_model=DashboardStats)
 def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Issue)
-    
-    # Apply role-based filtering
-    if current_user.role == UserRole.REPORTER:
-        query = query.filter(Issue.owner_id == current_user.id)
-    
-    issues = query.all()
-    
-    total_issues = len(issues)
-    open_issues = len([i for i in issues if i.status == IssueStatus.OPEN])
-    
-    severity_breakdown = {
-        "low": len([i for i in issues if i.severity == IssueSeverity.LOW]),
-        "medium": len([i for i in issues if i.severity == IssueSeverity.MEDIUM]),
-        "high": len([i for i in issues if i.severity == IssueSeverity.HIGH]),
-        "critical": len([i for i in issues if i.severity == IssueSeverity.CRITICAL])
-    }
-    
-    status_breakdown = {
-        "open": len([i for i in issues if i.status == IssueStatus.OPEN]),
-        "triaged": len([i for i in issues if i.status == IssueStatus.TRIAGED]),
-        "in_progress": len([i for i in issues if i.status == IssueStatus.IN_PROGRESS]),
-        "done": len([i for i in issues if i.status == IssueStatus.DONE])
-    }
-    
-    return DashboardStats(
-        total_issues=total_issues,
-        open_issues=open_issues,
-        severity_breakdown=severity_breakdown,
-        status_breakdown=status_breakdown
-    )
+    def compute() -> bytes:
+        # Read the live counters instead of scanning issues
+        scope = current_user.id if current_user.role == UserRole.REPORTER else counters.GLOBAL_SCOPE
+        live = counters.read_counters(db, scope)
 
+        severity_breakdown = {severity.value: 0 for severity in IssueSeverity}
+        status_breakdown = {issue_status.value: 0 for issue_status in IssueStatus}
+        for (issue_status, severity), n in live.items():
+            status_breakdown[issue_status.value] += n
+            severity_breakdown[severity.value] += n
+
+        return issue_reader.render_json(DashboardStats(
+            total_issues=sum(status_breakdown.values()),
+            open_issues=status_breakdown[IssueStatus.OPEN.value],
+            severity_breakdown=severity_breakdown,
+            status_breakdown=status_breakdown
+        ))
+
+    body = result_cache.get_or_compute("dashboard", _list_scope(current_user), {"source": read_source(db)}, compute)
+    return Response(content=body, media_type="application/json")
+
+# Default window per granularity when `from` is omitted
+TREND_DEFAULT_DAYS = {
+    TrendGranularity.DAY: 30,
+    TrendGranularity.WEEK: 7 * 12,
+    TrendGranularity.MONTH: 365,
+}
+
+@router.get("/dashboard/trends", response_model=DashboardTrends)
+def get_dashboard_trends(
+    granularity: TrendGranularity = TrendGranularity.DAY,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_maintainer_or_admin)
+):
+    """
+    Issue count trends served from the daily stats and the pre-rolled weekly
+    and monthly buckets. Daily points older than the retention window are
+    only available at week or month granularity.
+    """
+    to_date = to_date or date.today()
+    from_date = from_date or to_date - timedelta(days=TREND_DEFAULT_DAYS[granularity])
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    return DashboardTrends(
+        granularity=granularity,
+        points=trends.read_trend(db, granularity.value, from_date, to_date),
+    )
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
+import enum
 from app.models.models import UserRole, IssueStatus, IssueSeverity
 
 # -------------------------
@@ -55,6 +56,14 @@ class IssueResponse(IssueBase):
     class Config:
         from_attributes = True
 
+class IngestTicket(BaseModel):
+    ticket_id: str
+    status: str
+
+class IngestTicketStatus(IngestTicket):
+    issue_id: Optional[int] = None
+    error: Optional[str] = None
+
 # -------------------------
 # Auth Schemas
 # -------------------------
@@ -83,6 +92,27 @@ class DashboardStats(BaseModel):
     severity_breakdown: dict
     status_breakdown: dict
 
+class TrendGranularity(str, enum.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+class TrendPoint(BaseModel):
+    period_start: date
+    open_count: int
+    triaged_count: int
+    in_progress_count: int
+    done_count: int
+    low_count: int
+    medium_count: int
+    high_count: int
+    critical_count: int
+    total_count: int
+
+class DashboardTrends(BaseModel):
+    granularity: TrendGranularity
+    points: List[TrendPoint]
+
 class WebSocketMessage(BaseModel):
     type: str  # "issue_created", "issue_updated", "issue_deleted"
     data: dict
@@ -1,7 +1,15 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_failure, task_postrun, task_prerun, task_retry, worker_process_init, worker_process_shutdown
 import os
 
+from app.core import metrics
+from app.core.config import (
+    INGEST_DRAIN_INTERVAL_SECONDS, WORKER_PREFETCH_MULTIPLIER, WORKER_MAX_TASKS_PER_CHILD,
+    WORKER_MAX_MEMORY_PER_CHILD_KB,
+)
+from app.worker import runtime
+
 # Create Celery instance
 celery_app = Celery("issues_tracker")
 
@@ -14,9 +22,21 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Prefork: reserve one message per child at a time and recycle children
+    # before slow leaks (fragmentation, caches) accumulate
+    worker_prefetch_multiplier=WORKER_PREFETCH_MULTIPLIER,
+    worker_max_tasks_per_child=WORKER_MAX_TASKS_PER_CHILD,
+    worker_max_memory_per_child=WORKER_MAX_MEMORY_PER_CHILD_KB,
     task_routes={
         "app.worker.tasks.update_daily_stats": {"queue": "stats"},
+        "app.worker.tasks.backfill_daily_stats": {"queue": "stats"},
+        "app.worker.tasks.reconcile_issue_counters": {"queue": "stats"},
+        "app.worker.tasks.rollup_stats": {"queue": "stats"},
+        "app.worker.tasks.apply_stats_retention": {"queue": "stats"},
+        "app.worker.tasks.backfill_daily_stats_chunk": {"queue": "stats"},
         "app.worker.tasks.cleanup_old_files": {"queue": "cleanup"},
+        "app.worker.tasks.archive_done_issues": {"queue": "cleanup"},
+        "app.worker.tasks.drain_ingest_queue": {"queue": "ingest"},
     },
     beat_schedule={
         "update-daily-stats": {
@@ -31,8 +51,60 @@ celery_app.conf.update(
             "task": "app.worker.tasks.update_daily_stats",
             "schedule": crontab(minute="*/30"),  # Run every 30 minutes as required
         },
+        "reconcile-issue-counters": {
+            "task": "app.worker.tasks.reconcile_issue_counters",
+            "schedule": crontab(minute=15),  # Hourly drift correction; lock-free, one GROUP BY over live issues
+        },
+        "rollup-stats": {
+            "task": "app.worker.tasks.rollup_stats",
+            "schedule": crontab(minute="5,35"),  # Right after each daily stats run
+        },
+        "apply-stats-retention": {
+            "task": "app.worker.tasks.apply_stats_retention",
+            "schedule": crontab(minute=30, hour=3),  # Run daily at 3:30 AM
+        },
+        "archive-done-issues": {
+            "task": "app.worker.tasks.archive_done_issues",
+            "schedule": crontab(minute=0, hour=4),  # Daily, after stats retention
+        },
+        "drain-ingest-queue": {
+            "task": "app.worker.tasks.drain_ingest_queue",
+            "schedule": INGEST_DRAIN_INTERVAL_SECONDS,  # Write-behind flush interval
+        },
     },
 )
 
 # Auto-discover tasks
 celery_app.autodiscover_tasks(["app.worker"])
+
+
+# Each prefork child builds its own engine instead of sharing the parent's pool
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    runtime.init_process()
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    runtime.shutdown_process()
+
+
+# Task durations, failures and retries, read back by the API's /metrics
+@task_prerun.connect
+def _record_task_start(task_id=None, task=None, **kwargs):
+    metrics.task_started(task_id)
+
+
+@task_postrun.connect
+def _record_task_end(task_id=None, task=None, state=None, **kwargs):
+    metrics.task_finished(task_id, task.name, failed=False)
+
+
+@task_failure.connect
+def _record_task_failure(task_id=None, sender=None, **kwargs):
+    metrics.task_finished(task_id, sender.name, failed=True)
+
+
+@task_retry.connect
+def _record_task_retry(sender=None, **kwargs):
+    metrics.task_retried(sender.name)
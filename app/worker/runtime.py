@@ -0,0 +1,59 @@
+import logging
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import WORKER_DB_MAX_OVERFLOW, WORKER_DB_POOL_SIZE
+from app.database.database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+# This process's engine once init_process has run; None in the API and in tests
+_process_engine: Optional[Engine] = None
+
+
+def init_process() -> None:
+    """
+    Gives a freshly forked worker process its own engine and pool. Connections
+    inherited from the parent are dropped without being closed, since the
+    parent (or a sibling) may still be using the same sockets.
+    """
+    global _process_engine
+    engine.dispose(close=False)
+    # One task runs at a time per prefork child, so a small pool suffices
+    _process_engine = create_engine(
+        engine.url,
+        pool_size=WORKER_DB_POOL_SIZE,
+        max_overflow=WORKER_DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+    SessionLocal.configure(bind=_process_engine)
+    logger.info(f"Worker process {os.getpid()} has its own database pool")
+
+
+def shutdown_process() -> None:
+    global _process_engine
+    if _process_engine is not None:
+        _process_engine.dispose()
+        _process_engine = None
+
+
+@contextmanager
+def task_session() -> Iterator[Session]:
+    """
+    A session for one task run. It is rolled back if the body raises and
+    always closed, so a task that retries returns its connection first.
+    The body commits.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
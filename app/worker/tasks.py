@@ -1,103 +1,381 @@
-from celery import shared_task
+from celery import shared_task, group
+from redis.exceptions import LockNotOwnedError
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError, StatementError
 from sqlalchemy.orm import Session
-from app.database.database import get_db
-from app.models.models import Issue, DailyStats, IssueStatus
-from datetime import datetime, date
-import os
+from app.database.database import dialect_insert
+from app.models.models import ArchiveCounter, Issue, DailyStats, IssueStatus, IssueSeverity
+from app.core.redis_client import get_redis
+from app.core.config import (
+    INGEST_BATCH_SIZE, STATS_ROLLUP_LOOKBACK_DAYS, DAILY_STATS_RETENTION_DAYS,
+    UPLOAD_DIR, ORPHAN_GRACE_HOURS, ATTACHMENT_GC_BATCH_SIZE,
+    ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_MAX_BATCHES,
+)
+from app.core import ingest, counters, trends, attachments, archive
+from app.core.result_cache import result_cache
+from app.worker.runtime import task_session
+from datetime import datetime, date, timedelta
+from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+def aggregate_issue_counts(db: Session):
+    """
+    Counts issues by status and severity with a single GROUP BY over the live
+    table, plus the archive totals kept by archive_batch, so the cost does not
+    grow with the archived history.
+    """
+    counts = trends.empty_counts()
+    rows = (
+        db.query(Issue.status, Issue.severity, func.count(Issue.id))
+        .group_by(Issue.status, Issue.severity)
+        .all()
+    )
+    for issue_status, severity, n in rows:
+        trends.add_counts(counts, issue_status or IssueStatus.OPEN, severity or IssueSeverity.MEDIUM, n)
+    for (issue_status, severity), n in counters.read_counters(db, table=ArchiveCounter).items():
+        trends.add_counts(counts, issue_status, severity, n)
+    return counts
+
+def upsert_daily_stats(db: Session, day: date, values: dict):
+    """INSERT ... ON CONFLICT (date) DO UPDATE for one day's row."""
+    insert_stmt = dialect_insert(db.get_bind())(DailyStats)
+    now = datetime.utcnow()
+    stmt = insert_stmt.values(date=day, created_at=now, updated_at=now, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyStats.date],
+        set_={**values, "updated_at": now},
+    )
+    db.execute(stmt)
+
 @shared_task(bind=True)
 def update_daily_stats(self):
     """
     Background task to update daily statistics.
-    Runs every 30 minutes to aggregate issue counts by status.
+    Runs every 30 minutes, but skips the aggregation when no issue has been
+    created, updated or deleted since today's row was written.
     """
+    today = date.today()
     try:
-        # Get database session
-        db = next(get_db())
-        
-        today = date.today()
-        
-        # Count issues by status
-        open_count = db.query(Issue).filter(Issue.status == IssueStatus.OPEN).count()
-        triaged_count = db.query(Issue).filter(Issue.status == IssueStatus.TRIAGED).count()
-        in_progress_count = db.query(Issue).filter(Issue.status == IssueStatus.IN_PROGRESS).count()
-        done_count = db.query(Issue).filter(Issue.status == IssueStatus.DONE).count()
-        
-        # Check if stats for today already exist
-        existing_stats = db.query(DailyStats).filter(DailyStats.date == today).first()
-        
-        if existing_stats:
-            # Update existing record
-            existing_stats.open_count = open_count
-            existing_stats.triaged_count = triaged_count
-            existing_stats.in_progress_count = in_progress_count
-            existing_stats.done_count = done_count
-            logger.info(f"Updated daily stats for {today}")
-        else:
-            # Create new record
-            new_stats = DailyStats(
-                date=today,
-                open_count=open_count,
-                triaged_count=triaged_count,
-                in_progress_count=in_progress_count,
-                done_count=done_count
+        with task_session() as db:
+            # Cheap watermark check before the GROUP BY. Archived rows never change, so the
+            # archive contributes only its maintained total and archiving keeps the sum
+            source_updated_at, total = db.query(func.max(Issue.updated_at), func.count(Issue.id)).one()
+            total += sum(counters.read_counters(db, table=ArchiveCounter).values())
+            existing = (
+                db.query(DailyStats.source_updated_at, DailyStats.total_count)
+                .filter(DailyStats.date == today)
+                .first()
             )
-            db.add(new_stats)
-            logger.info(f"Created new daily stats for {today}")
-        
-        db.commit()
-        db.close()
-        
-        return {
-            "status": "success",
-            "date": str(today),
-            "open_count": open_count,
-            "triaged_count": triaged_count,
-            "in_progress_count": in_progress_count,
-            "done_count": done_count
-        }
-        
+            if existing and existing.source_updated_at == source_updated_at and existing.total_count == total:
+                logger.info(f"Daily stats for {today} are up to date, skipping")
+                return {"status": "skipped", "date": str(today)}
+
+            counts = aggregate_issue_counts(db)
+            upsert_daily_stats(db, today, {**counts, "source_updated_at": source_updated_at})
+            db.commit()
+        logger.info(f"Upserted daily stats for {today}")
+
+        return {"status": "success", "date": str(today), **counts}
+
     except Exception as exc:
         logger.error(f"Task failed: {exc}")
         raise self.retry(exc=exc, countdown=60, max_retries=3)
 
+@shared_task(bind=True)
+def reconcile_issue_counters(self):
+    """
+    Background task that recounts the live issue counters from the issues
+    table and corrects any drift left by writes that bypassed the ORM hooks.
+    """
+    try:
+        with task_session() as db:
+            corrected = counters.reconcile_counters(db)
+            db.commit()
+        return {"status": "success", "corrected": corrected}
+    except Exception as exc:
+        logger.error(f"Counter reconciliation failed: {exc}")
+        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
+@shared_task(bind=True)
+def rollup_stats(self, since: str = None):
+    """
+    Background task that refreshes the weekly and monthly trend buckets from
+    the daily stats. By default only the last few days' buckets are rebuilt;
+    pass an ISO date to rebuild everything from that day on.
+    """
+    since_day = date.fromisoformat(since) if since else date.today() - timedelta(days=STATS_ROLLUP_LOOKBACK_DAYS)
+    try:
+        with task_session() as db:
+            written = trends.rollup(db, since_day)
+            db.commit()
+        return {"status": "success", "since": str(since_day), "buckets": written}
+    except Exception as exc:
+        logger.error(f"Stats rollup failed: {exc}")
+        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
+@shared_task(bind=True)
+def apply_stats_retention(self):
+    """
+    Background task that downsamples daily stats older than the retention
+    window into their weekly and monthly buckets and deletes them.
+    """
+    try:
+        with task_session() as db:
+            deleted = trends.apply_retention(db, DAILY_STATS_RETENTION_DAYS)
+            db.commit()
+        if deleted:
+            logger.info(f"Downsampled {deleted} daily stats rows")
+        return {"status": "success", "deleted": deleted}
+    except Exception as exc:
+        logger.error(f"Stats retention failed: {exc}")
+        raise self.retry(exc=exc, countdown=300, max_retries=3)
+
+def _daily_created_counts(db: Session, before: datetime):
+    """Issue counts per creation day, status and severity for issues created before `before`."""
+    issues = archive.all_issues("id", "status", "severity", "created_at")
+    day = func.date(issues.c.created_at)
+    rows = (
+        db.query(day, issues.c.status, issues.c.severity, func.count(issues.c.id))
+        .filter(issues.c.created_at < before)
+        .group_by(day, issues.c.status, issues.c.severity)
+        .all()
+    )
+    for created_day, issue_status, severity, n in rows:
+        if isinstance(created_day, str):  # SQLite returns date() as text
+            created_day = date.fromisoformat(created_day)
+        yield created_day, issue_status or IssueStatus.OPEN, severity or IssueSeverity.MEDIUM, n
+
+@shared_task(bind=True)
+def backfill_daily_stats_chunk(self, start: str, end: str):
+    """
+    Rebuilds daily stats rows for the inclusive ISO date range [start, end].
+    Issues carry no status history, so each day counts the issues that existed
+    by the end of that day under their current status and severity.
+    """
+    start_day, end_day = date.fromisoformat(start), date.fromisoformat(end)
+    try:
+        with task_session() as db:
+            before = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+            baseline = trends.empty_counts()
+            created_per_day = {}
+            for created_day, issue_status, severity, n in _daily_created_counts(db, before):
+                if created_day < start_day:
+                    trends.add_counts(baseline, issue_status, severity, n)
+                else:
+                    trends.add_counts(created_per_day.setdefault(created_day, trends.empty_counts()), issue_status, severity, n)
+
+            # Running totals across the chunk, one upsert per day
+            running = baseline
+            day = start_day
+            while day <= end_day:
+                for key, n in created_per_day.get(day, {}).items():
+                    running[key] += n
+                upsert_daily_stats(db, day, {**running, "source_updated_at": None})
+                day += timedelta(days=1)
+            db.commit()
+        return {"status": "success", "start": start, "end": end}
+
+    except Exception as exc:
+        logger.error(f"Backfill of {start}..{end} failed: {exc}")
+        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
+@shared_task
+def backfill_daily_stats(start: str, end: str, chunk_days: int = 31):
+    """
+    Rebuilds historical daily stats between two ISO dates by fanning out
+    independent chunks that run in parallel on the stats queue.
+    """
+    start_day, end_day = date.fromisoformat(start), date.fromisoformat(end)
+    chunks = []
+    chunk_start = start_day
+    while chunk_start <= end_day:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_day)
+        chunks.append(backfill_daily_stats_chunk.s(chunk_start.isoformat(), chunk_end.isoformat()))
+        chunk_start = chunk_end + timedelta(days=1)
+
+    result = group(chunks).apply_async()
+    logger.info(f"Backfilling daily stats {start}..{end} in {len(chunks)} chunks")
+    return {"status": "scheduled", "group_id": result.id, "chunks": len(chunks)}
+
 @shared_task(bind=True)
 def cleanup_old_files(self):
     """
-    Background task to cleanup old uploaded files.
-    Runs daily to remove files older than 30 days.
+    Background task to garbage-collect orphaned uploads.
+    Runs daily and deletes only files that no issue references and that are
+    older than the grace period; an interrupted run resumes where it stopped.
     """
+    upload_dir = Path(UPLOAD_DIR)
+    if not upload_dir.exists():
+        return {"status": "success", "message": "No uploads directory found"}
+
     try:
-        uploads_dir = "uploads"
-        if not os.path.exists(uploads_dir):
-            return {"status": "success", "message": "No uploads directory found"}
-        
-        current_time = datetime.now()
-        deleted_files = []
-        
-        for filename in os.listdir(uploads_dir):
-            file_path = os.path.join(uploads_dir, filename)
-            if os.path.isfile(file_path):
-                # Get file modification time
-                file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                # Delete files older than 30 days
-                if (current_time - file_time).days > 30:
-                    try:
-                        os.remove(file_path)
-                        deleted_files.append(filename)
-                        logger.info(f"Deleted old file: {filename}")
-                    except OSError as e:
-                        logger.error(f"Error deleting file {filename}: {e}")
-        
-        return {
-            "status": "success",
-            "deleted_files": deleted_files,
-            "count": len(deleted_files)
-        }
-        
+        with task_session() as db:
+            result = attachments.collect_orphans(
+                db, upload_dir, ORPHAN_GRACE_HOURS * 3600, ATTACHMENT_GC_BATCH_SIZE
+            )
+        logger.info(
+            f"Attachment GC deleted {result['deleted']} of {result['scanned']} files, "
+            f"reclaimed {result['bytes_reclaimed']} bytes"
+        )
+        return {"status": "success", **result}
+
     except Exception as exc:
         logger.error(f"Cleanup task failed: {exc}")
         raise self.retry(exc=exc, countdown=300, max_retries=3)
+
+@shared_task(bind=True)
+def archive_done_issues(self, max_batches: int = ARCHIVE_MAX_BATCHES):
+    """
+    Background task that moves DONE issues untouched for ARCHIVE_AFTER_DAYS
+    into issues_archive. Each batch commits on its own so locks stay short
+    and an interrupted run simply leaves the rest for the next one.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    archived = batches = 0
+    try:
+        with task_session() as db:
+            while batches < max_batches:
+                moved = archive.archive_batch(db, cutoff, ARCHIVE_BATCH_SIZE)
+                if not moved:
+                    break
+                db.commit()
+                result_cache.invalidate_owners({owner_id for _, owner_id in moved})
+                archived += len(moved)
+                batches += 1
+
+        if archived:
+            logger.info(f"Archived {archived} done issues in {batches} batches")
+        return {"status": "success", "archived": archived, "batches": batches}
+
+    except Exception as exc:
+        logger.error(f"Issue archiving failed: {exc}")
+        raise self.retry(exc=exc, countdown=300, max_retries=3)
+
+def _ingest_row(payload):
+    """Maps one queued ingestion payload to an `issues` row."""
+    queued_at = datetime.fromisoformat(payload["queued_at"])
+    return {
+        "title": payload["title"],
+        "description": payload.get("description"),
+        "severity": IssueSeverity(payload.get("severity") or IssueSeverity.MEDIUM),
+        "tags": payload.get("tags"),
+        "status": IssueStatus.OPEN,
+        "owner_id": payload["owner_id"],
+        "created_at": queued_at,
+        "updated_at": queued_at,
+        "ingest_ticket": payload["ticket_id"],
+    }
+
+def _rejected_by_payload(error: Exception) -> bool:
+    """
+    Whether an insert failed because of the data (a constraint, a value the
+    column or driver rejects, e.g. a NUL byte on PostgreSQL) rather than
+    because the database is unavailable, which the drain retries instead.
+    """
+    if isinstance(error, OperationalError) or getattr(error, "connection_invalidated", False):
+        return False
+    return isinstance(error, (StatementError, ValueError))
+
+def _insert_ingested(db: Session, payloads):
+    """
+    Inserts a batch with one multi-row INSERT. Rows whose ticket is already
+    in `issues` are skipped (ON CONFLICT DO NOTHING), so replaying a batch
+    that was committed but never released resolves to the existing issues.
+    If the data of the batch is rejected, rows are retried one by one so a
+    single bad payload only fails its own ticket and never blocks the queue.
+    """
+    stmt = (
+        dialect_insert(db.get_bind())(Issue)
+        .on_conflict_do_nothing(index_elements=[Issue.ingest_ticket])
+        .returning(Issue.ingest_ticket)
+    )
+    rows, errors = [], {}
+    for payload in payloads:
+        try:
+            rows.append(_ingest_row(payload))
+        except (KeyError, ValueError) as e:
+            errors[payload["ticket_id"]] = f"Invalid payload: {e!r}"
+    if not rows:
+        return {}, errors
+    try:
+        return _insert_ingested_rows(db, stmt, rows), errors
+    except Exception as e:
+        db.rollback()
+        if not _rejected_by_payload(e):
+            raise
+
+    resolved = {}
+    for row in rows:
+        try:
+            resolved.update(_insert_ingested_rows(db, stmt, [row]))
+        except Exception as e:
+            db.rollback()
+            if not _rejected_by_payload(e):
+                raise
+            errors[row["ingest_ticket"]] = str(getattr(e, "orig", None) or e)
+    return resolved, errors
+
+def _insert_ingested_rows(db: Session, stmt, rows):
+    """Inserts `rows`, counts only the ones that were new, commits, and maps every ticket to its issue id."""
+    inserted = set(db.execute(stmt, rows).scalars().all())
+    counters.apply_deltas(db, counters.deltas_for_rows(row for row in rows if row["ingest_ticket"] in inserted))
+    tickets = [row["ingest_ticket"] for row in rows]
+    issue_ids = dict(db.query(Issue.ingest_ticket, Issue.id).filter(Issue.ingest_ticket.in_(tickets)))
+    db.commit()
+    return issue_ids
+
+@shared_task(bind=True)
+def drain_ingest_queue(self, max_batches: int = 20):
+    """
+    Background task that drains the write-behind ingestion queue.
+    Each batch is claimed atomically into a processing list, inserted with a
+    single multi-row INSERT, and only then released, so an interrupted run is
+    replayed by the next one; the insert skips tickets that already made it
+    into `issues`, so a replay never duplicates an issue.
+    """
+    r = get_redis()
+    lock = r.lock(ingest.DRAIN_LOCK_KEY, timeout=300, blocking=False)
+    if not lock.acquire():
+        return {"status": "skipped", "reason": "another drain is running"}
+
+    inserted = failed = batches = 0
+    try:
+        # Replay whatever a previous, interrupted run left behind
+        payloads = ingest.pending_batch(r)
+        if payloads:
+            done = ingest.already_resolved(r, [p["ticket_id"] for p in payloads])
+            payloads = [p for p in payloads if p["ticket_id"] not in done]
+
+        while batches < max_batches:
+            if not payloads:
+                payloads = ingest.claim_batch(r, INGEST_BATCH_SIZE)
+                if not payloads:
+                    break
+
+            with task_session() as db:
+                resolved, errors = _insert_ingested(db, payloads)
+
+            ingest.resolve_tickets(r, resolved, errors)
+            ingest.release_batch(r)
+            result_cache.invalidate_owners({p["owner_id"] for p in payloads})
+            inserted += len(resolved)
+            failed += len(errors)
+            batches += 1
+            payloads = []
+
+        if inserted or failed:
+            logger.info(f"Ingested {inserted} issues in {batches} batches ({failed} failed)")
+        return {"status": "success", "inserted": inserted, "failed": failed, "batches": batches}
+
+    except Exception as exc:
+        logger.error(f"Ingestion drain failed: {exc}")
+        raise self.retry(exc=exc, countdown=10, max_retries=3)
+    finally:
+        try:
+            lock.release()
+        except LockNotOwnedError:
+            # The lock expired mid-run and another drain may hold it now; the
+            # idempotent insert makes the overlap harmless
+            logger.warning("Ingestion drain outlived its lock")
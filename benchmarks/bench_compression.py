@@ -0,0 +1,82 @@
+"""
+Measures CPU cost against bytes saved for each available response coding on
+a representative, unpaginated issue list.
+
+Usage:
+    python -m benchmarks.bench_compression --issues 20000
+
+The list is rendered through the production read path from a seeded
+in-memory SQLite database (or --database-url, see bench_read_path).
+Brotli and zstd rows appear only when their packages are installed.
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import compression
+from app.core.issue_reader import read_issues_core
+from app.database.database import Base
+from benchmarks.bench_read_path import seed
+
+LEVELS = {
+    "gzip": lambda level: compression._Gzip(level),
+    "br": lambda level: compression._Brotli(level),
+    "zstd": lambda level: compression._Zstd(level),
+}
+DEFAULT_LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 6, 11], "zstd": [1, 3, 9]}
+
+
+def available_codings():
+    codings = ["gzip"]
+    if compression.brotli is not None:
+        codings.append("br")
+    if compression.zstandard is not None:
+        codings.append("zstd")
+    return codings
+
+
+def measure(coding: str, level: int, body: bytes, repeat: int, chunk_size: int):
+    samples, size = [], 0
+    for _ in range(repeat):
+        encoder = LEVELS[coding](level)
+        began = time.perf_counter()
+        if chunk_size:
+            out = [encoder.compress(body[i:i + chunk_size]) for i in range(0, len(body), chunk_size)]
+            compressed = b"".join(out) + encoder.finish()
+        else:
+            compressed = encoder.compress(body) + encoder.finish()
+        samples.append(time.perf_counter() - began)
+        size = len(compressed)
+    return statistics.median(samples), size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--issues", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=0, help="Compress in streamed chunks of this many bytes")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, args.issues)
+    body = read_issues_core(db, lambda query, model: query, None, 0, None)
+    print(f"payload: {len(body) / 1e6:.2f} MB ({args.issues} issues)")
+    print(f"{'coding':<6} {'level':>5} {'ms':>9} {'MB/s':>8} {'ratio':>7} {'saved MB':>9}")
+
+    for coding in available_codings():
+        for level in DEFAULT_LEVELS[coding]:
+            seconds, size = measure(coding, level, body, args.repeat, args.chunk_size)
+            print(
+                f"{coding:<6} {level:>5} {seconds * 1000:>9.1f} {len(body) / 1e6 / seconds:>8.1f} "
+                f"{len(body) / size:>7.1f} {(len(body) - size) / 1e6:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+HTTP load benchmark with scripted scenarios:
+
+* login_burst             - concurrent logins (password hashing bound)
+* list_mix                - issue list reads with filters, as reporters, maintainers and admins
+* dashboard_polling       - dashboard stats polled by every role
+* create_with_attachment  - multipart issue creation with a file upload
+* bulk_triage             - maintainers page through open issues and triage them
+
+Usage:
+    python -m benchmarks.bench_load --scenario all --concurrency 16 --duration 20 --output run.json
+    python -m benchmarks.bench_load --base-url http://localhost:8000 --scenario list_mix
+    python -m benchmarks.bench_load --output new.json --compare run.json
+
+Without --base-url the app is served in-process against --database-url (a
+scratch SQLite file by default), with tables created if missing. Results are
+JSON: throughput and p50/p95/p99 latency per endpoint for each scenario.
+--compare prints per-endpoint changes against an earlier run and exits with
+status 1 when a p95 regresses by more than --max-regression percent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+ROLES = ["reporter", "maintainer", "admin"]
+STATUSES = ["open", "triaged", "in_progress", "done"]
+SEVERITIES = ["low", "medium", "high", "critical"]
+PASSWORD = "bench-password"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Latencies and error counts per endpoint label, e.g. "GET /issues/{issue_id}"."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        began = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.latencies[label].append(time.perf_counter() - began)
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - began)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    def summary(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for label, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            endpoints[label] = {
+                "requests": len(ordered),
+                "errors": self.errors[label],
+                "throughput_rps": len(ordered) / elapsed,
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "p99_ms": percentile(ordered, 99) * 1000,
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "duration_s": elapsed,
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": total / elapsed,
+            "endpoints": endpoints,
+        }
+
+
+class Fixture:
+    """Users (one token per role slot) and the emails needed to log them in again."""
+
+    def __init__(self):
+        self.users: Dict[str, List[Dict]] = {role: [] for role in ROLES}
+
+    async def create(self, client: httpx.AsyncClient, users_per_role: int, issues: int) -> None:
+        for role in ROLES:
+            for _ in range(users_per_role):
+                email = f"bench-{role}-{uuid.uuid4().hex[:10]}@example.com"
+                response = await client.post("/users/register", json={
+                    "email": email, "password": PASSWORD, "full_name": f"Bench {role}", "role": role,
+                })
+                response.raise_for_status()
+                response = await client.post("/users/token", data={"username": email, "password": PASSWORD})
+                response.raise_for_status()
+                token = response.json()["access_token"]
+                self.users[role].append({"email": email, "headers": {"Authorization": f"Bearer {token}"}})
+
+        rng = random.Random(0)
+        for i in range(issues):
+            reporter = self.users["reporter"][i % users_per_role]
+            response = await client.post("/issues/", headers=reporter["headers"], data={
+                "title": f"Seeded issue {i}",
+                "description": "Steps to reproduce:\n" + "  step\n" * 20,
+                "severity": rng.choice(SEVERITIES),
+                "tags": "bench,seed",
+            })
+            response.raise_for_status()
+
+    def headers(self, role: str, rng: random.Random) -> Dict:
+        return rng.choice(self.users[role])["headers"]
+
+
+# Scenarios: one iteration of a virtual user's script
+
+async def login_burst(client, fixture: Fixture, recorder: Recorder, rng: random.Random, args) -> None:
+    user = rng.choice(fixture.users[rng.choice(ROLES)])
+    await recorder.request(client, "POST /users/token", "POST", "/users/token",
+                           data={"username": user["email"], "password": PASSWORD})
+
+
+async def list_mix(client, fixture: Fixture, recorder: Recorder, rng: random.Random, args) -> None:
+    role = rng.choice(ROLES)
+    params = {"limit": rng.choice([20, 50, 100])}
+    if rng.random() < 0.5:
+        params["status"] = rng.choice(STATUSES)
+    if rng.random() < 0.3:
+        params["severity"] = rng.choice(SEVERITIES)
+    await recorder.request(client, f"GET /issues/ ({role})", "GET", "/issues/",
+                           headers=fixture.headers(role, rng), params=params)
+
+
+async def dashboard_polling(client, fixture: Fixture, recorder: Recorder, rng: random.Random, args) -> None:
+    role = rng.choice(ROLES)
+    await recorder.request(client, f"GET /issues/dashboard/stats ({role})", "GET", "/issues/dashboard/stats",
+                           headers=fixture.headers(role, rng))
+    await asyncio.sleep(args.poll_interval)
+
+
+async def create_with_attachment(client, fixture: Fixture, recorder: Recorder, rng: random.Random, args) -> None:
+    attachment = rng.randbytes(args.attachment_kb * 1024)
+    await recorder.request(
+        client, "POST /issues/ (attachment)", "POST", "/issues/",
+        headers=fixture.headers("reporter", rng),
+        data={"title": "Crash with dump", "description": "See attached", "severity": rng.choice(SEVERITIES)},
+        files={"file": ("dump.bin", attachment, "application/octet-stream")},
+    )
+
+
+async def bulk_triage(client, fixture: Fixture, recorder: Recorder, rng: random.Random, args) -> None:
+    headers = fixture.headers("maintainer", rng)
+    response = await recorder.request(client, "GET /issues/?status=open", "GET", "/issues/", headers=headers,
+                                      params={"status": "open", "limit": 20, "skip": rng.randrange(0, 200, 20)})
+    if response is None or response.status_code != 200:
+        return
+    for issue in response.json():
+        await recorder.request(client, "PUT /issues/{issue_id}", "PUT", f"/issues/{issue['id']}", headers=headers,
+                               json={"status": rng.choice(["triaged", "in_progress", "done"])})
+
+
+SCENARIOS = {
+    "login_burst": login_burst,
+    "list_mix": list_mix,
+    "dashboard_polling": dashboard_polling,
+    "create_with_attachment": create_with_attachment,
+    "bulk_triage": bulk_triage,
+}
+
+
+async def run_scenario(client, fixture: Fixture, name: str, args) -> Dict:
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.duration
+    script = SCENARIOS[name]
+
+    async def virtual_user(n: int) -> None:
+        rng = random.Random(f"{args.seed}:{name}:{n}")
+        while time.perf_counter() < deadline:
+            await script(client, fixture, recorder, rng, args)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(virtual_user(n) for n in range(args.concurrency)))
+    return recorder.summary(time.perf_counter() - began)
+
+
+def in_process_transport(database_url: str) -> httpx.AsyncBaseTransport:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    # Virtual users would otherwise trip the per-caller limits before measuring anything
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+    from app.database.database import Base, get_db
+    from main import app
+
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def bench_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = bench_db
+    return httpx.ASGITransport(app=app)
+
+
+async def run(args) -> Dict:
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        target = args.base_url
+    else:
+        client = httpx.AsyncClient(transport=in_process_transport(args.database_url),
+                                   base_url="http://bench", timeout=args.timeout)
+        target = f"in-process ({args.database_url})"
+
+    names = list(SCENARIOS) if args.scenario == "all" else args.scenario.split(",")
+    async with client:
+        fixture = Fixture()
+        await fixture.create(client, args.users_per_role, args.seed_issues)
+        results = {name: await run_scenario(client, fixture, name, args) for name in names}
+
+    return {
+        "meta": {
+            "target": target,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, max_regression: float) -> bool:
+    """Prints p95 changes per endpoint; returns False when any regresses beyond the threshold."""
+    ok = True
+    for scenario, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if before is None:
+            continue
+        for label, stats in result["endpoints"].items():
+            old = before["endpoints"].get(label)
+            if old is None or not old["p95_ms"]:
+                continue
+            change = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            regressed = change > max_regression
+            ok = ok and not regressed
+            print(f"{'REGRESSION' if regressed else 'ok':<10} {scenario:<24} {label:<40} "
+                  f"p95 {old['p95_ms']:8.1f} -> {stats['p95_ms']:8.1f} ms ({change:+.0f}%)")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--database-url", default="sqlite:///./bench_load.db")
+    parser.add_argument("--scenario", default="all", help=f"all, or a comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8, help="Virtual users per scenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--users-per-role", type=int, default=5)
+    parser.add_argument("--seed-issues", type=int, default=200)
+    parser.add_argument("--attachment-kb", type=int, default=256)
+    parser.add_argument("--poll-interval", type=float, default=0.0, help="Pause between dashboard polls per user")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1, help="Makes every virtual user's choices reproducible")
+    parser.add_argument("--output", default=None, help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", default=None, help="Baseline JSON from an earlier run")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="Allowed p95 increase in percent")
+    args = parser.parse_args()
+
+    unknown = set(args.scenario.split(",")) - set(SCENARIOS) - {"all"}
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(baseline, results, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+WebSocket fan-out benchmark for /ws and ConnectionManager.broadcast_issue_update.
+
+For each client count in --clients the driver opens that many local
+WebSocket clients against a uvicorn server started in a subprocess, fires
+--events issue events at --rate per second, and reports end-to-end delivery
+latency (p50/p95/p99/max), dropped messages and server CPU.
+
+Usage:
+    python -m benchmarks.bench_websocket --clients 100,1000,5000,10000,20000 --events 50 --rate 10
+    python -m benchmarks.bench_websocket --clients 200 --output ws.json
+
+The server process is the real app plus two bench-only routes that are never
+mounted in production: POST /__bench/broadcast schedules one
+broadcast_issue_update carrying its send time, GET /__bench/stats reports the
+open connection count and process CPU time. Client and server share a host,
+so send and receive timestamps share a clock. Large steps need a high open
+file limit; the soft limit is raised to the hard limit in both processes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from benchmarks.bench_load import percentile
+
+
+def raise_fd_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+# Server side
+
+def serve(port: int) -> None:
+    import logging
+
+    import uvicorn
+
+    from app.core.websocket import manager
+    from main import app
+
+    # Fan-out needs no database; skip schema setup
+    app.router.on_startup.clear()
+    # Per-connection INFO lines would dominate server CPU at large steps
+    logging.getLogger("app.core.websocket").setLevel(logging.WARNING)
+
+    @app.post("/__bench/broadcast", status_code=202)
+    async def bench_broadcast(seq: int):
+        issue = {"id": seq, "title": f"Bench issue {seq}", "status": "open", "sent_at": time.time()}
+        asyncio.get_running_loop().create_task(manager.broadcast_issue_update(issue, "issue_created"))
+        return {"queued": seq}
+
+    @app.get("/__bench/stats")
+    async def bench_stats():
+        return {"connections": len(manager.active_connections), "cpu_seconds": time.process_time()}
+
+    raise_fd_limit()
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", ws_max_queue=1024)
+
+
+# Driver side
+
+class Client:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.seen = set()
+        self.failed = False
+
+
+async def listen(url: str, client: Client, ready: asyncio.Event, stop: asyncio.Event) -> None:
+    try:
+        async with websockets.connect(url, max_queue=None, open_timeout=60, ping_interval=None) as ws:
+            ready.set()
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                received = time.time()
+                message = json.loads(raw)
+                data = message["data"]
+                client.seen.add(data["id"])
+                client.latencies.append(received - data["sent_at"])
+    except (OSError, websockets.WebSocketException, asyncio.TimeoutError):
+        client.failed = True
+        ready.set()
+
+
+async def wait_for_connections(http: httpx.AsyncClient, expected: int, timeout: float) -> int:
+    deadline = time.monotonic() + timeout
+    while True:
+        connections = (await http.get("/__bench/stats")).json()["connections"]
+        if connections == expected or time.monotonic() > deadline:
+            return connections
+        await asyncio.sleep(0.2)
+
+
+async def run_step(base_url: str, clients: int, args) -> Dict:
+    ws_url = base_url.replace("http://", "ws://") + "/ws"
+    stop = asyncio.Event()
+    states = [Client() for _ in range(clients)]
+    tasks = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        began = time.perf_counter()
+        for start in range(0, clients, args.connect_batch):
+            batch = []
+            for state in states[start:start + args.connect_batch]:
+                ready = asyncio.Event()
+                tasks.append(asyncio.create_task(listen(ws_url, state, ready, stop)))
+                batch.append(ready.wait())
+            await asyncio.gather(*batch)
+        failed = sum(state.failed for state in states)
+        connected = await wait_for_connections(http, clients - failed, timeout=30)
+        connect_seconds = time.perf_counter() - began
+
+        cpu_before = (await http.get("/__bench/stats")).json()["cpu_seconds"]
+        fire_began = time.perf_counter()
+        for seq in range(args.events):
+            await http.post("/__bench/broadcast", params={"seq": seq})
+            next_at = fire_began + (seq + 1) / args.rate
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+        # Wait until every live client has everything, or the settle timeout
+        deadline = time.perf_counter() + args.settle
+        live = [state for state in states if not state.failed]
+        while time.perf_counter() < deadline and any(len(state.seen) < args.events for state in live):
+            await asyncio.sleep(0.1)
+        wall = time.perf_counter() - fire_began
+        cpu_seconds = (await http.get("/__bench/stats")).json()["cpu_seconds"] - cpu_before
+
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await wait_for_connections(http, 0, timeout=30)
+
+    latencies = sorted(latency for state in states for latency in state.latencies)
+    expected = connected * args.events
+    return {
+        "clients": clients,
+        "connected": connected,
+        "connect_failures": failed,
+        "connect_seconds": connect_seconds,
+        "events": args.events,
+        "expected_deliveries": expected,
+        "delivered": len(latencies),
+        "dropped": max(expected - len(latencies), 0),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+        "server_cpu_seconds": cpu_seconds,
+        "server_cpu_percent": cpu_seconds / wall * 100,
+    }
+
+
+async def drive(args) -> List[Dict]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    for clients in [int(n) for n in args.clients.split(",")]:
+        result = await run_step(base_url, clients, args)
+        print(
+            f"{clients:>6} clients: delivered {result['delivered']}/{result['expected_deliveries']} "
+            f"p50 {result['p50_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms  "
+            f"cpu {result['server_cpu_percent']:.0f}%",
+            file=sys.stderr,
+        )
+        results.append(result)
+    return results
+
+
+def wait_for_server(base_url: str, server: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("benchmark server exited during startup")
+        try:
+            httpx.get(f"{base_url}/__bench/stats", timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("benchmark server did not come up")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="100,500,1000,5000,10000", help="Comma-separated client counts to step through")
+    parser.add_argument("--events", type=int, default=20, help="Issue events fired per step")
+    parser.add_argument("--rate", type=float, default=5.0, help="Events per second")
+    parser.add_argument("--settle", type=float, default=30.0, help="Seconds to wait for late deliveries")
+    parser.add_argument("--connect-batch", type=int, default=500, help="Clients connecting concurrently")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default=None, help="Write the JSON results here instead of stdout")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    fd_limit = raise_fd_limit()
+    if max(int(n) for n in args.clients.split(",")) + 100 > fd_limit:
+        print(f"warning: open file limit is {fd_limit}; large steps will fail to connect", file=sys.stderr)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_websocket", "--serve", "--port", str(args.port)],
+        env={**os.environ, "RESULT_CACHE_BACKEND": "none", "RATE_LIMIT_BACKEND": "none"},
+    )
+    try:
+        wait_for_server(f"http://127.0.0.1:{args.port}", server)
+        results = asyncio.run(drive(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {"rate": args.rate, "events": args.events, "steps": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,26 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends
-from app.database.database import Base, engine, get_db
-from app.routers import user, issue
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Response
+from app.database.database import engine, get_db
+from app.routers import user, issue, admin
 from app.core.websocket import manager
+from app.core.compression import CompressionMiddleware
+from app.core.startup import run_startup
+from app.core.metrics import (
+    MetricsMiddleware, PoolCollector, CeleryTaskCollector, StatsCollector, register_collector,
+)
+from app.core.sql_profiling import SQLProfilingMiddleware
+from app.core.memory_diagnostics import MemoryDiagnosticsMiddleware
+from app.core.result_cache import result_cache
+from app.database.replicas import ReadYourWritesMiddleware, replicas
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.bulkheads import BulkheadMiddleware, threadpool
+from app.core.db_timeouts import QueryGuardMiddleware, operational_error_handler, pool_timeout_handler
+from sqlalchemy import exc as sa_exc
+from app.core.singleflight import flights
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.core import config
 from app.core.dependencies import get_current_user
 from sqlalchemy.orm import Session
 import logging
-from sqlalchemy import text # Import text for raw SQL execution
-
-# Import your enum classes from models
-from app.models.models import UserRole, IssueStatus, IssueSeverity
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,52 +33,65 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# NEW: Robustly create database enum types and tables on startup
+# Negotiated br/zstd/gzip compression for large JSON payloads
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=config.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=config.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=config.COMPRESSION_BROTLI_QUALITY,
+    zstd_level=config.COMPRESSION_ZSTD_LEVEL,
+)
+
+# Opt-in query counting per request (SQL_PROFILING)
+app.add_middleware(SQLProfilingMiddleware)
+
+# Opt-in sampled allocation tracking per route (MEMORY_DIAGNOSTICS)
+app.add_middleware(MemoryDiagnosticsMiddleware)
+
+# Pins writers to the primary for READ_YOUR_WRITES_SECONDS when replicas are configured
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-route-group statement timeouts and query cancellation on client disconnect
+app.add_middleware(QueryGuardMiddleware)
+app.add_exception_handler(sa_exc.OperationalError, operational_error_handler)
+app.add_exception_handler(sa_exc.TimeoutError, pool_timeout_handler)
+
+# Per-route-group concurrency caps with bounded queues (BULKHEAD_*)
+app.add_middleware(BulkheadMiddleware)
+
+# Token bucket limits per caller and route group (RATE_LIMIT_*); rejections skip everything inside
+app.add_middleware(RateLimitMiddleware)
+
+# Added last so latency includes compression and every other middleware
+app.add_middleware(MetricsMiddleware)
+
+register_collector(PoolCollector({
+    "primary": engine,
+    **{f"replica{i}": replica.engine for i, replica in enumerate(replicas.replicas)},
+}))
+register_collector(CeleryTaskCollector())
+register_collector(StatsCollector("result_cache", result_cache))
+register_collector(StatsCollector("coalescing", flights))
+register_collector(StatsCollector("threadpool", threadpool))
+
+# Size the sync route threadpool (THREADPOOL_SIZE); the limiter is per event loop
+@app.on_event("startup")
+async def configure_threadpool():
+    threadpool.configure(config.THREADPOOL_SIZE)
+
+# Prepare the schema (see STARTUP_SCHEMA_MODE) and warm the connection pool
 @app.on_event("startup")
 def startup_event():
-    logger.info("Ensuring database enum types and tables exist...")
-    
-    # Get a connection to execute raw SQL for enum types
-    with engine.connect() as connection:
-        # Create UserRole enum type if it doesn't exist
-        user_role_values = ", ".join([f"'{role.value}'" for role in UserRole])
-        connection.execute(text(f"""
-            DO $$ BEGIN
-                IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'userrole') THEN
-                    CREATE TYPE userrole AS ENUM ({user_role_values});
-                END IF;
-            END $$;
-        """))
-        
-        # Create IssueStatus enum type if it doesn't exist
-        issue_status_values = ", ".join([f"'{status.value}'" for status in IssueStatus])
-        connection.execute(text(f"""
-            DO $$ BEGIN
-                IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'issuestatus') THEN
-                    CREATE TYPE issuestatus AS ENUM ({issue_status_values});
-                END IF;
-            END $$;
-        """))
-
-        # Create IssueSeverity enum type if it doesn't exist
-        issue_severity_values = ", ".join([f"'{severity.value}'" for severity in IssueSeverity])
-        connection.execute(text(f"""
-            DO $$ BEGIN
-                IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'issueseverity') THEN
-                    CREATE TYPE issueseverity AS ENUM ({issue_severity_values});
-                END IF;
-            END $$;
-        """))
-        
-        connection.commit() # Commit the enum type creation
-
-    # Now, create all tables (which might depend on the enums)
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database enum types and tables ensured.")
+    timings = run_startup(engine, config.STARTUP_SCHEMA_MODE, config.STARTUP_POOL_PREWARM)
+    app.state.startup_timings = timings
+    logger.info(
+        "Startup finished: " + ", ".join(f"{phase}={seconds * 1000:.0f}ms" for phase, seconds in timings.items())
+    )
 
 # Include routers
 app.include_router(user.router)
 app.include_router(issue.router)
+app.include_router(admin.router)
 
 # WebSocket endpoint for real-time updates
 @app.websocket("/ws")
@@ -80,6 +105,11 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
+# Prometheus scrape endpoint (text exposition format)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Test route
 @app.get("/", tags=["Root"])
 def read_root():
@@ -0,0 +1,36 @@
+import os
+import re
+
+import pytest
+
+# The suite runs in one process without Redis
+os.environ.setdefault("RESULT_CACHE_GENERATIONS", "local")
+
+from app.core import config  # noqa: E402
+
+
+def query_count(response) -> int:
+    """Number of SQL queries reported in a response's Server-Timing header."""
+    match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers.get("server-timing", ""))
+    assert match, "response has no db Server-Timing entry; is SQL profiling on?"
+    return int(match.group(1))
+
+
+@pytest.fixture
+def query_budget(monkeypatch):
+    """
+    Turns on SQL profiling and returns check(response, max_queries), which
+    fails the test when the request ran more queries than its budget. The
+    result cache is off, so every request runs the queries being budgeted.
+    """
+    from app.core.result_cache import result_cache
+
+    monkeypatch.setattr(config, "SQL_PROFILING", True)
+    monkeypatch.setattr(result_cache, "backend", None)
+
+    def check(response, max_queries: int) -> int:
+        count = query_count(response)
+        assert count <= max_queries, f"{response.request.method} {response.request.url.path} ran {count} queries, budget is {max_queries}"
+        return count
+
+    return check
@@ -3,9 +3,11 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.database.database import get_db, Base
+from app.models.models import Issue, DailyStats
 from main import app
 import tempfile
 import os
+import uuid
 
 # Create in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -70,6 +72,20 @@ def admin_user():
     token = response.json()["access_token"]
     return {"token": token, "user": user_data}
 
+def auth_headers(role="reporter"):
+    """Register a fresh user with the given role and return its auth headers"""
+    email = f"{role}-{uuid.uuid4().hex[:8]}@example.com"
+    response = client.post("/users/register", json={
+        "email": email,
+        "password": "password123",
+        "full_name": f"{role.title()} User",
+        "role": role
+    })
+    assert response.status_code == 200
+    response = client.post("/users/token", data={"username": email, "password": "password123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
 class TestAuthentication:
     """Test authentication and authorization"""
     
@@ -216,6 +232,1353 @@ class TestRoleBasedAccess:
         response = client.delete(f"/issues/{issue_id}", headers=headers)
         assert response.status_code == 200
 
+class TestIngestion:
+    """Test the write-behind ingestion pipeline"""
+
+    def test_ingest_validates_payload(self):
+        """Test that invalid issues are rejected before they are queued"""
+        response = client.post("/issues/ingest", headers=auth_headers(), json={"description": "no title"})
+        assert response.status_code == 422
+
+    def test_drain_inserts_batch(self):
+        """Test that a drained batch becomes issues in one multi-row insert"""
+        from app.worker.tasks import _insert_ingested
+
+        payloads = [
+            {"ticket_id": f"t{i}", "owner_id": 1, "queued_at": "2025-01-01T00:00:00",
+             "title": f"Crash {i}", "severity": "high"}
+            for i in range(3)
+        ]
+        db = TestingSessionLocal()
+        try:
+            resolved, errors = _insert_ingested(db, payloads)
+            assert errors == {}
+            assert list(resolved) == ["t0", "t1", "t2"]
+            titles = [db.get(Issue, issue_id).title for issue_id in resolved.values()]
+            assert titles == ["Crash 0", "Crash 1", "Crash 2"]
+        finally:
+            db.close()
+
+    def test_replayed_batch_is_not_inserted_twice(self):
+        """Test that replaying a committed but unreleased batch resolves to the same issues"""
+        from app.core import counters
+        from app.worker.tasks import _insert_ingested
+
+        owner_id = 1
+        payloads = [
+            {"ticket_id": f"replay-{uuid.uuid4().hex}", "owner_id": owner_id, "queued_at": "2025-01-01T00:00:00",
+             "title": f"Replayed {i}"}
+            for i in range(2)
+        ]
+        db = TestingSessionLocal()
+        try:
+            first, _ = _insert_ingested(db, payloads[:1])
+            before = (db.query(Issue).count(), counters.read_counters(db, owner_id))
+            # The drain crashed after committing the first payload; the replay carries the whole batch
+            replayed, errors = _insert_ingested(db, payloads)
+            assert errors == {}
+            assert replayed[payloads[0]["ticket_id"]] == first[payloads[0]["ticket_id"]]
+            assert db.query(Issue).count() == before[0] + 1
+            assert sum(counters.read_counters(db, owner_id).values()) == sum(before[1].values()) + 1
+        finally:
+            db.close()
+
+    def test_bad_payload_fails_only_its_ticket(self):
+        """Test that a payload the driver rejects (a NUL byte) fails its ticket while the rest of the batch commits"""
+        from sqlalchemy import event
+        from app.worker.tasks import _insert_ingested
+
+        def has_nul(value):
+            if isinstance(value, str):
+                return "\x00" in value
+            if isinstance(value, dict):
+                return any(has_nul(v) for v in value.values())
+            if isinstance(value, (list, tuple)):
+                return any(has_nul(v) for v in value)
+            return False
+
+        def reject_nul(conn, cursor, statement, parameters, context, executemany):
+            # What psycopg2 does; SQLite would store the NUL byte
+            if has_nul(parameters):
+                raise ValueError("A string literal cannot contain NUL (0x00) characters.")
+
+        payloads = [
+            {"ticket_id": f"nul-{uuid.uuid4().hex}", "owner_id": 1, "queued_at": "2025-01-01T00:00:00",
+             "title": title}
+            for title in ("Valid", "Broken\x00title")
+        ]
+        db = TestingSessionLocal()
+        event.listen(engine, "before_cursor_execute", reject_nul)
+        try:
+            resolved, errors = _insert_ingested(db, payloads)
+        finally:
+            event.remove(engine, "before_cursor_execute", reject_nul)
+        try:
+            assert list(resolved) == [payloads[0]["ticket_id"]]
+            assert "NUL" in errors[payloads[1]["ticket_id"]]
+            assert db.get(Issue, resolved[payloads[0]["ticket_id"]]).title == "Valid"
+        finally:
+            db.close()
+
+    def test_ingest_returns_ticket_with_202(self, monkeypatch):
+        """Test that a valid issue is queued and answered with its ticket"""
+        from app.core import ingest
+        from app.core.redis_client import get_redis
+
+        monkeypatch.setitem(app.dependency_overrides, get_redis, lambda: None)
+        monkeypatch.setattr(ingest, "enqueue_issue", lambda r, issue_data, owner_id: "ticket-1")
+        response = client.post("/issues/ingest", headers=auth_headers(), json={"title": "Queued"})
+        assert response.status_code == 202
+        assert response.json() == {"ticket_id": "ticket-1", "status": "queued"}
+
+    def test_full_queue_is_backpressured_with_503(self, monkeypatch):
+        """Test that a full queue rejects new work with 503 and Retry-After"""
+        from app.core import ingest
+        from app.core.redis_client import get_redis
+
+        def full(r, issue_data, owner_id):
+            raise ingest.IngestQueueFull(10_000)
+
+        monkeypatch.setitem(app.dependency_overrides, get_redis, lambda: None)
+        monkeypatch.setattr(ingest, "enqueue_issue", full)
+        response = client.post("/issues/ingest", headers=auth_headers(), json={"title": "Rejected"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "30"
+
+    def test_ticket_status_is_visible_to_its_owner_only(self, monkeypatch):
+        """Test the ticket status endpoint for the owner, another reporter and an unknown ticket"""
+        from app.core import ingest
+        from app.core.redis_client import get_redis
+
+        owner = auth_headers()
+        owner_id = client.post("/issues/", headers=owner, data={"title": "Finds the owner id"}).json()["owner_id"]
+        tickets = {"ticket-2": {"status": "done", "owner_id": str(owner_id), "issue_id": "42"}}
+        monkeypatch.setitem(app.dependency_overrides, get_redis, lambda: None)
+        monkeypatch.setattr(ingest, "get_ticket", lambda r, ticket_id: tickets.get(ticket_id))
+
+        response = client.get("/issues/ingest/ticket-2", headers=owner)
+        assert response.status_code == 200
+        assert response.json() == {"ticket_id": "ticket-2", "status": "done", "issue_id": 42, "error": None}
+        assert client.get("/issues/ingest/ticket-2", headers=auth_headers()).status_code == 403
+        assert client.get("/issues/ingest/missing", headers=owner).status_code == 404
+
+    def test_drain_tolerates_an_expired_lock(self, monkeypatch):
+        """Test that a drain whose lock expired mid-run still finishes instead of raising"""
+        from redis.exceptions import LockNotOwnedError
+        from app.core import ingest
+        from app.worker import tasks
+
+        class ExpiredLock:
+            def acquire(self):
+                return True
+
+            def release(self):
+                raise LockNotOwnedError("lock expired")
+
+        class FakeRedis:
+            def lock(self, name, timeout, blocking):
+                return ExpiredLock()
+
+        monkeypatch.setattr(tasks, "get_redis", FakeRedis)
+        monkeypatch.setattr(ingest, "pending_batch", lambda r: [])
+        monkeypatch.setattr(ingest, "claim_batch", lambda r, size: [])
+        assert tasks.drain_ingest_queue()["status"] == "success"
+
+class TestDailyStats:
+    """Test the daily stats aggregation"""
+
+    def test_upsert_keeps_one_row_per_day(self):
+        """Test that repeated runs update the day's row instead of inserting"""
+        from datetime import date
+        from app.worker.tasks import aggregate_issue_counts, upsert_daily_stats
+
+        db = TestingSessionLocal()
+        try:
+            day = date(2024, 2, 29)
+            counts = aggregate_issue_counts(db)
+            assert counts["total_count"] == db.query(Issue).count()
+            assert counts["total_count"] == sum(counts[f"{s}_count"] for s in ("open", "triaged", "in_progress", "done"))
+
+            upsert_daily_stats(db, day, {**counts, "open_count": 1})
+            upsert_daily_stats(db, day, {**counts, "open_count": 2})
+            db.commit()
+
+            rows = db.query(DailyStats).filter(DailyStats.date == day).all()
+            assert len(rows) == 1
+            assert rows[0].open_count == 2
+        finally:
+            db.close()
+
+class TestTrends:
+    """Test the trends API and its rollups"""
+
+    def test_weekly_trend_uses_last_day_of_week(self):
+        """Test that rollups keep the latest snapshot and retention keeps trends"""
+        from datetime import date, timedelta
+        from app.core import trends
+        from app.worker.tasks import upsert_daily_stats
+
+        db = TestingSessionLocal()
+        try:
+            monday = date(2023, 1, 2)
+            for offset in range(14):
+                counts = {column: 0 for column in trends.COUNT_COLUMNS}
+                counts["open_count"] = counts["total_count"] = offset
+                upsert_daily_stats(db, monday + timedelta(days=offset), counts)
+            trends.rollup(db, monday)
+            deleted = trends.apply_retention(db, keep_days=30, today=date(2023, 6, 1))
+            db.commit()
+            assert deleted >= 14
+        finally:
+            db.close()
+
+        headers = auth_headers("maintainer")
+        response = client.get("/issues/dashboard/trends?granularity=week&from=2023-01-02&to=2023-01-15", headers=headers)
+        assert response.status_code == 200
+        points = response.json()["points"]
+        assert [p["period_start"] for p in points] == ["2023-01-02", "2023-01-09"]
+        assert [p["open_count"] for p in points] == [6, 13]
+
+        response = client.get("/issues/dashboard/trends?granularity=day&from=2023-01-02&to=2023-01-15", headers=headers)
+        assert response.json()["points"] == []
+
+    def test_reporters_cannot_read_trends(self):
+        """Test that trends are limited to maintainers and admins"""
+        response = client.get("/issues/dashboard/trends", headers=auth_headers("reporter"))
+        assert response.status_code == 403
+
+class TestIssueCounters:
+    """Test the transactionally maintained issue counters"""
+
+    def test_dashboard_follows_writes(self):
+        """Test that create, update and delete move the dashboard counters"""
+        reporter = auth_headers("reporter")
+        admin = auth_headers("admin")
+
+        response = client.post("/issues/", headers=reporter, data={"title": "Counted", "severity": "critical"})
+        issue_id = response.json()["id"]
+        stats = client.get("/issues/dashboard/stats", headers=reporter).json()
+        assert stats["total_issues"] == 1
+        assert stats["open_issues"] == 1
+        assert stats["severity_breakdown"]["critical"] == 1
+
+        client.put(f"/issues/{issue_id}", headers=admin, json={"status": "done"})
+        stats = client.get("/issues/dashboard/stats", headers=reporter).json()
+        assert stats["open_issues"] == 0
+        assert stats["status_breakdown"]["done"] == 1
+
+        client.delete(f"/issues/{issue_id}", headers=admin)
+        stats = client.get("/issues/dashboard/stats", headers=reporter).json()
+        assert stats["total_issues"] == 0
+
+    def test_reconcile_corrects_drift(self):
+        """Test that reconciliation restores counters that drifted"""
+        from app.core import counters
+        from app.models.models import IssueCounter
+
+        db = TestingSessionLocal()
+        try:
+            counters.reconcile_counters(db)
+            db.commit()
+            db.query(IssueCounter).delete()
+            db.commit()
+
+            assert counters.reconcile_counters(db) > 0
+            db.commit()
+            assert sum(counters.read_counters(db).values()) == db.query(Issue).count()
+        finally:
+            db.close()
+
+    def test_reconcile_keeps_writes_committed_during_the_recount(self):
+        """Test that a write committing between the recount and the correction is neither lost nor doubled"""
+        from sqlalchemy import event
+        from app.core import counters
+        from app.models.models import ArchiveCounter, IssueCounter
+
+        db = TestingSessionLocal()
+        try:
+            db.add(Issue(title="Counted before the recount", owner_id=1))
+            db.commit()
+            db.query(IssueCounter).delete()
+            db.commit()
+
+            written = []
+
+            def concurrent_write(session):
+                # Runs when the recount's snapshot ends, before its corrections are applied
+                if written:
+                    return
+                written.append(1)
+                writer = TestingSessionLocal()
+                try:
+                    writer.add(Issue(title="Written during the recount", owner_id=1))
+                    writer.commit()
+                finally:
+                    writer.close()
+
+            event.listen(db, "after_rollback", concurrent_write)
+            try:
+                assert counters.reconcile_counters(db) > 0
+            finally:
+                event.remove(db, "after_rollback", concurrent_write)
+            db.commit()
+            assert written
+            archived = sum(counters.read_counters(db, table=ArchiveCounter).values())
+            assert sum(counters.read_counters(db).values()) == db.query(Issue).count() + archived
+        finally:
+            db.close()
+
+class TestAttachmentGC:
+    """Test the orphaned attachment collector"""
+
+    def test_only_old_unreferenced_files_are_deleted(self, tmp_path):
+        """Test that referenced and recent files survive the GC"""
+        import json
+        import time
+        from pathlib import Path
+        from app.core.attachments import collect_orphans, STATE_FILE
+
+        for name in ("a-referenced.txt", "b-orphan.txt", "c-recent.txt", "zz-orphan.bin"):
+            (tmp_path / name).write_bytes(b"x" * 10)
+        for name in ("a-referenced.txt", "b-orphan.txt", "zz-orphan.bin"):
+            os.utime(tmp_path / name, (0, 0))
+        # Resume an interrupted run that already finished the "0" shard
+        (tmp_path / STATE_FILE).write_text(json.dumps({
+            "started_at": time.time(), "done_shards": ["0"], "scanned": 0, "deleted": 0, "bytes_reclaimed": 0
+        }))
+
+        db = TestingSessionLocal()
+        try:
+            db.add(Issue(title="Has attachment", file_path=str(tmp_path / "a-referenced.txt"), owner_id=1))
+            db.commit()
+            result = collect_orphans(db, Path(tmp_path), grace_seconds=3600, batch_size=2)
+        finally:
+            db.close()
+
+        assert result["resumed"] is True
+        assert result["deleted"] == 2
+        assert result["bytes_reclaimed"] == 20
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["a-referenced.txt", "c-recent.txt"]
+
+    def test_references_survive_an_upload_dir_change(self, tmp_path):
+        """Test that a file stays referenced when UPLOAD_DIR is spelled differently than at upload"""
+        from pathlib import Path
+        from app.core.attachments import collect_orphans
+
+        (tmp_path / "d-moved.txt").write_bytes(b"x")
+        os.utime(tmp_path / "d-moved.txt", (0, 0))
+
+        db = TestingSessionLocal()
+        try:
+            # Stored under a relative UPLOAD_DIR; the GC now runs against an absolute one
+            db.add(Issue(title="Relative upload path", file_path="uploads/d-moved.txt", owner_id=1))
+            db.commit()
+            result = collect_orphans(db, Path(tmp_path), grace_seconds=3600)
+        finally:
+            db.close()
+
+        assert result["deleted"] == 0
+        assert (tmp_path / "d-moved.txt").exists()
+
+    def test_directory_is_listed_once_per_run(self, tmp_path, monkeypatch):
+        """Test that the GC lists the upload directory once, not once per shard"""
+        from pathlib import Path
+        from app.core import attachments
+
+        for name in ("0-a.txt", "7-b.txt", "f-c.txt", "zz-d.txt"):
+            (tmp_path / name).write_bytes(b"x")
+        listings = []
+        real_scandir = os.scandir
+        monkeypatch.setattr(attachments.os, "scandir", lambda path: listings.append(path) or real_scandir(path))
+
+        db = TestingSessionLocal()
+        try:
+            result = attachments.collect_orphans(db, Path(tmp_path), grace_seconds=3600, batch_size=2)
+        finally:
+            db.close()
+        assert len(listings) == 1
+        assert result["scanned"] == 4
+
+class TestConditionalGet:
+    """Test ETag / Last-Modified revalidation of issue reads"""
+
+    def test_issue_revalidation(self):
+        """Test that an unchanged issue answers 304 until it is updated"""
+        headers = auth_headers("maintainer")
+        issue_id = client.post("/issues/", headers=headers, data={"title": "Cached"}).json()["id"]
+
+        response = client.get(f"/issues/{issue_id}", headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert etag.startswith('W/"')
+
+        response = client.get(f"/issues/{issue_id}", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        last_modified = response.headers["last-modified"]
+        response = client.get(f"/issues/{issue_id}", headers={**headers, "If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+        client.put(f"/issues/{issue_id}", headers=headers, json={"status": "triaged"})
+        response = client.get(f"/issues/{issue_id}", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_issue_etag_follows_the_embedded_owner(self):
+        """Test that renaming the owner changes the ETag of representations that embed the owner"""
+        from app.models.models import User
+
+        headers = auth_headers("maintainer")
+        created = client.post("/issues/", headers=headers, data={"title": "Owner renamed"}).json()
+        url = f"/issues/{created['id']}"
+        etag = client.get(url, headers=headers).headers["etag"]
+        title_etag = client.get(f"{url}?fields=title", headers=headers).headers["etag"]
+
+        db = TestingSessionLocal()
+        try:
+            db.get(User, created["owner_id"]).full_name = "Renamed Owner"
+            db.commit()
+        finally:
+            db.close()
+
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["owner"]["full_name"] == "Renamed Owner"
+        assert client.get(f"{url}?fields=title", headers={**headers, "If-None-Match": title_etag}).status_code == 304
+
+    def test_list_revalidation(self):
+        """Test that the list ETag changes with new rows and differs per filter"""
+        headers = auth_headers("reporter")
+        client.post("/issues/", headers=headers, data={"title": "First"})
+
+        etag = client.get("/issues/", headers=headers).headers["etag"]
+        assert client.get("/issues/", headers={**headers, "If-None-Match": etag}).status_code == 304
+        assert client.get("/issues/?severity=high", headers=headers).headers["etag"] != etag
+
+        client.post("/issues/", headers=headers, data={"title": "Second"})
+        response = client.get("/issues/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+
+    def test_list_is_not_revalidated_by_date_alone(self):
+        """Test that lists carry no Last-Modified, so If-Modified-Since cannot hide a deleted row"""
+        from email.utils import format_datetime
+        from datetime import datetime, timedelta, timezone
+
+        admin = auth_headers("admin")
+        keep = client.post("/issues/", headers=admin, data={"title": "Kept"}).json()["id"]
+        gone = client.post("/issues/", headers=admin, data={"title": "Deleted"}).json()["id"]
+        response = client.get("/issues/", headers=admin)
+        assert "last-modified" not in response.headers
+
+        client.delete(f"/issues/{gone}", headers=admin)
+        later = format_datetime(datetime.now(timezone.utc) + timedelta(hours=1), usegmt=True)
+        response = client.get("/issues/", headers={**admin, "If-Modified-Since": later})
+        assert response.status_code == 200
+        ids = [issue["id"] for issue in response.json()]
+        assert keep in ids and gone not in ids
+
+class TestResultCache:
+    """Test the issue list / dashboard result cache"""
+
+    def test_dashboard_hits_cache_until_a_write(self):
+        """Test that repeated dashboards are served from cache and writes invalidate them"""
+        from app.core.result_cache import result_cache
+
+        headers = auth_headers("reporter")
+        first = client.get("/issues/dashboard/stats", headers=headers).json()
+        hits = result_cache.hits
+        assert client.get("/issues/dashboard/stats", headers=headers).json() == first
+        assert result_cache.hits == hits + 1
+
+        client.post("/issues/", headers=headers, data={"title": "Invalidates"})
+        stats = client.get("/issues/dashboard/stats", headers=headers).json()
+        assert stats["total_issues"] == first["total_issues"] + 1
+
+    def test_list_body_matches_its_etag_before_invalidation_lands(self, monkeypatch):
+        """Test that a reader racing a commit's generation bump never gets the old body under the new ETag"""
+        from app.core.result_cache import result_cache
+
+        headers = auth_headers("reporter")
+        client.post("/issues/", headers=headers, data={"title": "Before"})
+        before = client.get("/issues/", headers=headers)
+
+        # The write commits, but its invalidation is not visible yet
+        monkeypatch.setattr(result_cache, "invalidate_owners", lambda owner_ids: None)
+        client.post("/issues/", headers=headers, data={"title": "After"})
+        after = client.get("/issues/", headers=headers)
+        assert after.headers["etag"] != before.headers["etag"]
+        assert [issue["title"] for issue in after.json()] == ["Before", "After"]
+
+    def test_invalidation_reaches_other_processes(self, monkeypatch):
+        """Test that a write committed in another process (e.g. a Celery task) invalidates this process's memory cache"""
+        from app.core import result_cache as module
+        from app.core.result_cache import ALL_SCOPE, MemoryBackend, RedisGenerations, ResultCache
+
+        class SharedRedis:
+            def __init__(self):
+                self.values = {}
+
+            def get(self, key):
+                return self.values.get(key)
+
+            def incr(self, key):
+                self.values[key] = int(self.values.get(key, 0)) + 1
+
+        monkeypatch.setattr(module, "get_redis", lambda shared=SharedRedis(): shared)
+        api = ResultCache(MemoryBackend(16, 1 << 20, 60, RedisGenerations()))
+        worker = ResultCache(MemoryBackend(16, 1 << 20, 60, RedisGenerations()))
+
+        assert api.get_or_compute("issues", ALL_SCOPE, {}, lambda: b"before") == b"before"
+        assert api.get_or_compute("issues", ALL_SCOPE, {}, lambda: b"cached") == b"before"
+        worker.invalidate_owners([1])
+        assert api.get_or_compute("issues", ALL_SCOPE, {}, lambda: b"after") == b"after"
+
+    def test_list_pages(self):
+        """Test that pages are cached separately"""
+        headers = auth_headers("reporter")
+        for title in ("One", "Two", "Three"):
+            client.post("/issues/", headers=headers, data={"title": title})
+        assert [i["title"] for i in client.get("/issues/?limit=2", headers=headers).json()] == ["One", "Two"]
+        assert [i["title"] for i in client.get("/issues/?skip=2&limit=2", headers=headers).json()] == ["Three"]
+
+    def test_cache_stats_admin_only(self):
+        """Test the cache stats endpoint"""
+        assert client.get("/admin/cache/stats", headers=auth_headers("maintainer")).status_code == 403
+        data = client.get("/admin/cache/stats", headers=auth_headers("admin")).json()
+        assert data["backend"] == "memory"
+        assert 0.0 <= data["hit_ratio"] <= 1.0
+        assert "memory_bytes" in data
+
+class TestSingleFlight:
+    """Test request coalescing"""
+
+    def test_concurrent_calls_share_one_computation(self):
+        """Test that callers arriving while a computation runs share its result"""
+        import threading
+        import time
+        from app.core.singleflight import SingleFlight
+
+        flights = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return b"result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flights.do("key", compute))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while flights.executed + flights.coalesced < 5:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert results == [b"result"] * 5
+        assert flights.stats()["coalesced"] == 4
+        assert flights.stats()["in_flight"] == 0
+
+    def test_followers_retry_after_leader_disconnect(self):
+        """Test that a leader cancelled by its own client's disconnect does not fail its followers"""
+        import sqlite3
+        import threading
+        import time
+        from sqlalchemy import exc as sa_exc
+        from app.core import db_timeouts
+        from app.core.singleflight import SingleFlight
+
+        flights = SingleFlight(abandoned=db_timeouts.cancelled_by_disconnect)
+        release = threading.Event()
+        calls = []
+
+        def leader_compute():
+            calls.append("leader")
+            state = db_timeouts.RequestQueries("list", 0)
+            state.disconnected = True
+            db_timeouts._current.set(state)
+            release.wait(5)
+            raise sa_exc.OperationalError("SELECT", {}, sqlite3.OperationalError("interrupted"))
+
+        def follower_compute():
+            calls.append("follower")
+            time.sleep(0.2)  # long enough for the other followers to coalesce on the new leader
+            return b"result"
+
+        errors, results = [], []
+
+        def lead():
+            try:
+                flights.do("key", leader_compute)
+            except sa_exc.OperationalError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        while flights.executed < 1:
+            time.sleep(0.01)
+        followers = [threading.Thread(target=lambda: results.append(flights.do("key", follower_compute))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        while flights.coalesced < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        assert len(errors) == 1
+        assert results == [b"result"] * 3
+        assert calls == ["leader", "follower"]
+
+class TestSparseFieldsets:
+    """Test ?fields= projections"""
+
+    def test_list_and_detail_return_only_requested_fields(self):
+        """Test that only whitelisted, requested fields are returned"""
+        headers = auth_headers("reporter")
+        issue_id = client.post("/issues/", headers=headers, data={"title": "Sparse", "description": "long text"}).json()["id"]
+
+        items = client.get("/issues/?fields=status,id,title", headers=headers).json()
+        assert items == [{"title": "Sparse", "id": issue_id, "status": "open"}]
+
+        item = client.get(f"/issues/{issue_id}?fields=owner,updated_at", headers=headers).json()
+        assert set(item) == {"updated_at", "owner"}
+        assert item["owner"]["role"] == "reporter"
+
+        full = client.get(f"/issues/{issue_id}", headers=headers).json()
+        assert full["description"] == "long text"
+
+    def test_unknown_field_is_rejected(self):
+        """Test that fields outside the whitelist are rejected"""
+        response = client.get("/issues/?fields=title,hashed_password", headers=auth_headers("reporter"))
+        assert response.status_code == 400
+        assert "hashed_password" in response.json()["detail"]
+
+class TestReadPaths:
+    """Test that the Core/orjson list path matches the ORM/Pydantic path"""
+
+    def test_core_path_is_byte_compatible(self):
+        """Test both read paths produce identical bytes, with and without ?fields="""
+        from datetime import datetime
+        from app.core.issue_reader import read_issues_core, read_issues_orm
+
+        headers = auth_headers("reporter")
+        client.post("/issues/", headers=headers, data={"title": "Ünïcode ✓ \u2028 \"quoted\" \x1f", "tags": "a,b"})
+        client.post("/issues/", headers=headers, data={"title": "No description", "severity": "critical"})
+
+        db = TestingSessionLocal()
+        try:
+            issue = db.query(Issue).order_by(Issue.id.desc()).first()
+            issue.updated_at = datetime(2025, 1, 2, 3, 4, 5, 600)
+            db.commit()
+
+            owner_id = issue.owner_id
+            filters = lambda query, model: query.filter(model.owner_id == owner_id)
+            for fields in (None, ["title", "status", "updated_at"], ["id", "owner"]):
+                core = read_issues_core(db, filters, fields, 0, None)
+                orm = read_issues_orm(db, filters, fields, 0, None)
+                assert core == orm
+            assert read_issues_core(db, filters, None, 1, 1) == read_issues_orm(db, filters, None, 1, 1)
+        finally:
+            db.close()
+
+class TestCompression:
+    """Test negotiated response compression"""
+
+    def test_negotiation(self):
+        """Test that q-values win and ties follow server preference"""
+        from app.core.compression import negotiate
+
+        assert negotiate("gzip, br", ["br", "gzip"]) == "br"
+        assert negotiate("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+        assert negotiate("identity", ["gzip"]) is None
+        assert negotiate("*;q=0.1", ["gzip"]) == "gzip"
+        assert negotiate("gzip;q=0", ["gzip"]) is None
+
+    def test_large_json_is_compressed_small_is_not(self):
+        """Test the minimum-size threshold on API responses"""
+        headers = {**auth_headers("reporter"), "Accept-Encoding": "gzip"}
+        client.post("/issues/", headers=headers, data={"title": "Big", "description": "x" * 5000})
+
+        response = client.get("/issues/", headers=headers)
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json()[0]["description"] == "x" * 5000
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_streamed_response_is_compressed_per_chunk(self):
+        """Test that streamed bodies are compressed chunk by chunk"""
+        import zlib
+        from starlette.applications import Starlette
+        from starlette.responses import StreamingResponse
+        from starlette.routing import Route
+        from app.core.compression import CompressionMiddleware
+
+        def export(request):
+            return StreamingResponse((f"line {i}\n".encode() for i in range(100)), media_type="text/csv")
+
+        streaming_app = Starlette(routes=[Route("/export", export)])
+        streaming_app.add_middleware(CompressionMiddleware, minimum_size=10_000)
+        chunks = []
+        with TestClient(streaming_app).stream("GET", "/export", headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            assert "content-length" not in response.headers
+            chunks = list(response.iter_raw())
+        body = zlib.decompress(b"".join(chunks), 16 + zlib.MAX_WBITS)
+        assert body.decode().splitlines()[-1] == "line 99"
+
+class TestMetrics:
+    """Test the Prometheus metrics endpoint"""
+
+    def test_latency_is_labelled_by_route_template(self):
+        """Test that concrete ids never become label values"""
+        headers = auth_headers("reporter")
+        issue_id = client.post("/issues/", headers=headers, data={"title": "Metrics"}).json()["id"]
+        client.get(f"/issues/{issue_id}", headers=headers)
+        client.get(f"/no-such-path/{uuid.uuid4().hex}")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'route="/issues/{issue_id}"' in body
+        assert f'route="/issues/{issue_id}"' not in body
+        assert 'route="<unmatched>"' in body
+        assert "http_requests_in_progress" in body
+        assert "db_pool_checkout_seconds_count" in body
+        assert "result_cache_hits" in body
+
+    def test_websocket_connections_gauge(self):
+        """Test that the connection gauge follows connects and disconnects"""
+        from app.core.metrics import WEBSOCKET_CONNECTIONS
+
+        with client.websocket_connect("/ws"):
+            assert WEBSOCKET_CONNECTIONS._value.get() == 1
+        client.get("/")
+        assert WEBSOCKET_CONNECTIONS._value.get() == 0
+
+class TestQueryBudgets:
+    """Test per-request SQL profiling and endpoint query budgets"""
+
+    def test_issue_list_owner_is_not_n_plus_one(self, query_budget, monkeypatch):
+        """Test that listing issues of many owners does not load each owner separately"""
+        from app.core import config
+
+        headers = auth_headers("maintainer")
+        for _ in range(5):
+            client.post("/issues/", headers=auth_headers("reporter"), data={"title": "Owned"})
+
+        for read_path in ("core", "orm"):
+            monkeypatch.setattr(config, "ISSUE_READ_PATH", read_path)
+            response = client.get("/issues/?fields=id,owner", headers=headers)
+            assert response.status_code == 200
+            query_budget(response, 3)
+
+    def test_issue_detail_budget(self, query_budget):
+        """Test that an issue read, with its owner, stays within three queries"""
+        headers = auth_headers("reporter")
+        issue_id = client.post("/issues/", headers=headers, data={"title": "Budget"}).json()["id"]
+        query_budget(client.get(f"/issues/{issue_id}", headers=headers), 3)
+
+    def test_repeated_statement_is_reported(self, caplog, monkeypatch):
+        """Test the N+1 warning when one request repeats a statement"""
+        from fastapi import FastAPI
+        from sqlalchemy import text
+        from app.core import config
+        from app.core.sql_profiling import SQLProfilingMiddleware
+
+        monkeypatch.setattr(config, "SQL_PROFILING", True)
+        monkeypatch.setattr(config, "SQL_PROFILING_REPEAT_THRESHOLD", 3)
+        looping_app = FastAPI()
+        looping_app.add_middleware(SQLProfilingMiddleware)
+
+        @looping_app.get("/loop")
+        def loop():
+            with engine.connect() as conn:
+                for i in range(5):
+                    conn.execute(text("SELECT :i"), {"i": i})
+            return {}
+
+        with caplog.at_level("WARNING", logger="app.core.sql_profiling"):
+            response = TestClient(looping_app).get("/loop")
+        assert 'desc="5 queries"' in response.headers["server-timing"]
+        assert "Possible N+1" in caplog.text
+
+class TestProfiler:
+    """Test the on-demand sampling profiler"""
+
+    def test_profile_returns_collapsed_stacks(self):
+        """Test that a busy thread shows up as a collapsed stack"""
+        import threading
+        import time
+
+        stop = threading.Event()
+
+        def spin_for_profiler():
+            while not stop.is_set():
+                sum(range(1000))
+
+        worker = threading.Thread(target=spin_for_profiler, name="spinner")
+        worker.start()
+        try:
+            response = client.get("/admin/profile?seconds=0.2&hz=50", headers=auth_headers("admin"))
+        finally:
+            stop.set()
+            worker.join()
+
+        assert response.status_code == 200
+        assert int(response.headers["x-profile-samples"]) >= 5
+        lines = response.text.splitlines()
+        spinner = [line for line in lines if line.startswith("spinner;")]
+        assert spinner and "spin_for_profiler (test_main.py)" in spinner[0]
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    def test_one_session_at_a_time(self):
+        """Test that a second session is rejected while one is running"""
+        from app.core.profiler import profiler
+
+        headers = auth_headers("admin")
+        profiler._lock.acquire()
+        try:
+            response = client.get("/admin/profile?seconds=0.1", headers=headers)
+        finally:
+            profiler._lock.release()
+        assert response.status_code == 409
+
+        assert client.get("/admin/profile?seconds=0.1", headers=auth_headers("reporter")).status_code == 403
+
+class TestMemoryDiagnostics:
+    """Test tracemalloc-based allocation tracking"""
+
+    @pytest.fixture
+    def tracing(self, monkeypatch):
+        import tracemalloc
+        from app.core import config
+        from app.core.memory_diagnostics import memory_diagnostics
+
+        monkeypatch.setattr(config, "MEMORY_DIAGNOSTICS", True)
+        monkeypatch.setattr(config, "MEMORY_DIAGNOSTICS_SAMPLE_RATE", 1.0)
+        yield memory_diagnostics
+        memory_diagnostics.reset()
+        tracemalloc.stop()
+
+    def test_disabled_by_default(self):
+        """Test that the endpoints refuse to work while diagnostics are off"""
+        response = client.post("/admin/memory/snapshots", headers=auth_headers("admin"))
+        assert response.status_code == 409
+
+    def test_allocation_per_route(self, tracing):
+        """Test that sampled requests are aggregated under their route template"""
+        headers = auth_headers("reporter")
+        issue_id = client.post("/issues/", headers=headers, data={"title": "Memory"}).json()["id"]
+        client.get(f"/issues/{issue_id}", headers=headers)
+
+        routes = client.get("/admin/memory/routes", headers=auth_headers("admin")).json()
+        assert routes["/issues/{issue_id}"]["samples"] == 1
+        assert routes["/issues/"]["peak_bytes_max"] > 0
+
+    def test_snapshot_diff(self, tracing):
+        """Test that a diff points at the allocation site that grew"""
+        headers = auth_headers("admin")
+        first = client.post("/admin/memory/snapshots", headers=headers).json()["id"]
+        retained = [bytearray(1024) for _ in range(2000)]
+        second = client.post("/admin/memory/snapshots", headers=headers).json()["id"]
+
+        response = client.get(f"/admin/memory/diff?from={first}&to={second}&limit=5", headers=headers)
+        assert response.status_code == 200
+        assert any("test_main.py" in site["site"] and site["size_diff_bytes"] >= 2000 * 1024
+                   for site in response.json())
+        assert len(retained) == 2000
+
+        response = client.get(f"/admin/memory/diff?from={first}&to=999999", headers=headers)
+        assert response.status_code == 404
+
+class TestStartup:
+    """Test schema startup modes and pool prewarming"""
+
+    def test_check_mode_requires_head_revision(self, tmp_path):
+        """Test that check mode fails fast on an unmigrated database and passes once at head"""
+        from alembic import command
+        from app.core.startup import SchemaOutOfDate, alembic_config, run_startup
+
+        boot_engine = create_engine(f"sqlite:///{tmp_path}/boot.db")
+        with pytest.raises(SchemaOutOfDate):
+            run_startup(boot_engine, "check", 0)
+
+        with boot_engine.connect() as connection:
+            command.stamp(alembic_config(connection), "head")
+            connection.commit()
+        timings = run_startup(boot_engine, "migrate", 2)
+        assert set(timings) == {"schema_migrate", "pool_prewarm", "total"}
+        assert run_startup(boot_engine, "check", 0)["schema_check"] >= 0
+
+    def test_create_mode_builds_tables(self, tmp_path):
+        """Test the legacy create mode and rejection of unknown modes"""
+        from sqlalchemy import inspect
+        from app.core.startup import run_startup
+
+        boot_engine = create_engine(f"sqlite:///{tmp_path}/boot.db")
+        run_startup(boot_engine, "create", 0)
+        assert {"users", "issues", "daily_stats"} <= set(inspect(boot_engine).get_table_names())
+        with pytest.raises(ValueError):
+            run_startup(boot_engine, "fast", 0)
+
+class TestReadReplicas:
+    """Test read-replica routing, failover and read-your-writes"""
+
+    @pytest.fixture
+    def replica(self, tmp_path, monkeypatch):
+        """An empty replica database, so reads served from it are recognisable"""
+        from app.database import replicas as replicas_module
+
+        replica = replicas_module.Replica(f"sqlite:///{tmp_path}/replica.db")
+        Base.metadata.create_all(bind=replica.engine)
+        monkeypatch.setattr(replicas_module.replicas, "replicas", [replica])
+        return replica
+
+    def test_reads_go_to_replica_and_writers_are_pinned(self, replica):
+        """Test that a writer reads its own write while others read the replica"""
+        writer = auth_headers("reporter")
+        reader = auth_headers("maintainer")
+        client.post("/issues/", headers=writer, data={"title": "Fresh write"})
+
+        mine = client.get("/issues/?limit=7", headers=writer).json()
+        assert [issue["title"] for issue in mine] == ["Fresh write"]
+        assert client.get("/issues/?limit=7", headers=reader).json() == []
+
+    def test_replica_reads_never_fill_the_primary_cache(self, replica):
+        """Test that a stale replica list cached in the shared scope is not served to a pinned writer"""
+        from app.core.result_cache import result_cache
+
+        assert result_cache.enabled
+        writer = auth_headers("maintainer")
+        reader = auth_headers("maintainer")
+        client.post("/issues/", headers=writer, data={"title": "Shared scope write"})
+
+        stale = client.get("/issues/", headers=reader)
+        assert stale.json() == []
+        fresh = client.get("/issues/", headers=writer)
+        assert "Shared scope write" in [issue["title"] for issue in fresh.json()]
+        assert fresh.headers["etag"] != stale.headers["etag"]
+        assert client.get("/issues/", headers={**writer, "If-None-Match": stale.headers["etag"]}).status_code == 200
+
+    def test_replica_reads_do_not_hold_a_primary_connection(self, replica, monkeypatch):
+        """Test that only authentication touches the primary when a replica serves the read"""
+        opened = []
+
+        def counting_get_db():
+            opened.append(1)
+            yield from override_get_db()
+
+        monkeypatch.setitem(app.dependency_overrides, get_db, counting_get_db)
+        reader = auth_headers("maintainer")
+        writer = auth_headers("maintainer")
+        client.post("/issues/", headers=writer, data={"title": "Pins the writer"})
+
+        opened.clear()
+        assert client.get("/issues/", headers=reader).status_code == 200
+        assert len(opened) == 1  # the user lookup, released before the route runs
+        opened.clear()
+        assert client.get("/issues/", headers=writer).status_code == 200
+        assert len(opened) == 1  # pinned: the read falls back to that same primary session
+
+    def test_primary_reads_hold_one_connection_at_a_time(self, monkeypatch):
+        """Test that without a replica, read routes never hold two primary connections at once"""
+        from sqlalchemy import event
+        from app.core.result_cache import result_cache
+
+        def eager_get_db():
+            # Like get_db, check the connection out before the route runs
+            db = TestingSessionLocal()
+            try:
+                db.connection()
+                yield db
+            finally:
+                db.close()
+
+        monkeypatch.setattr(result_cache, "backend", None)
+        monkeypatch.setitem(app.dependency_overrides, get_db, eager_get_db)
+        headers = auth_headers("maintainer")
+        client.post("/issues/", headers=headers, data={"title": "Read from the primary"})
+
+        held, peak = [0], [0]
+
+        def checkout(*args):
+            held[0] += 1
+            peak[0] = max(peak[0], held[0])
+
+        def checkin(*args):
+            held[0] -= 1
+
+        event.listen(engine, "checkout", checkout)
+        event.listen(engine, "checkin", checkin)
+        try:
+            for url in ("/issues/", "/issues/dashboard/stats", "/issues/dashboard/trends"):
+                peak[0] = 0
+                assert client.get(url, headers=headers).status_code == 200
+                assert peak[0] == 1, url
+        finally:
+            event.remove(engine, "checkout", checkout)
+            event.remove(engine, "checkin", checkin)
+
+    def test_unreachable_replica_fails_over_to_primary(self, replica, monkeypatch):
+        """Test that a failing replica is marked down and the primary serves the read"""
+        from app.database import replicas as replicas_module
+
+        broken = replicas_module.Replica("sqlite:////nonexistent-dir/replica.db")
+        monkeypatch.setattr(replicas_module.replicas, "replicas", [broken])
+        headers = auth_headers("maintainer")
+
+        response = client.get("/issues/?limit=9", headers=headers)
+        assert response.status_code == 200
+        status = client.get("/admin/replicas", headers=auth_headers("admin")).json()
+        assert status[0]["healthy"] is False
+
+class TestQueryGuard:
+    """Test statement timeouts, disconnect cancellation and timeout responses"""
+
+    def test_route_groups(self):
+        """Test route grouping and per-group settings parsing"""
+        from app.core.route_groups import parse_group_settings, route_group
+
+        assert route_group("GET", "/issues/") == "list"
+        assert route_group("PUT", "/issues/{issue_id}") == "write"
+        assert route_group("GET", "/admin/cache/stats") == "admin"
+        settings = parse_group_settings("list=100, dashboard=50", 1000)
+        assert (settings["list"], settings["dashboard"], settings["detail"]) == (100, 50, 1000)
+        with pytest.raises(ValueError):
+            parse_group_settings("lists=100", 1000)
+
+    def test_disconnect_cancels_running_query(self, tmp_path):
+        """Test that a client going away interrupts the request's query"""
+        import asyncio
+        import time
+        from fastapi import FastAPI
+        from sqlalchemy import exc as sa_exc, text
+        from app.core.db_timeouts import QueryGuardMiddleware, operational_error_handler
+        from app.core.metrics import DB_QUERIES_CANCELLED
+
+        slow_engine = create_engine(f"sqlite:///{tmp_path}/slow.db", connect_args={"check_same_thread": False})
+        guarded_app = FastAPI()
+        guarded_app.add_middleware(QueryGuardMiddleware)
+        guarded_app.add_exception_handler(sa_exc.OperationalError, operational_error_handler)
+
+        @guarded_app.get("/slow")
+        def slow():
+            with slow_engine.connect() as conn:
+                conn.execute(text(
+                    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000) "
+                    "SELECT count(*) FROM n"
+                ))
+            return {}
+
+        async def call():
+            messages = [{"type": "http.request", "body": b"", "more_body": False}]
+            sent = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await asyncio.sleep(0.3)
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {"type": "http", "method": "GET", "path": "/slow", "raw_path": b"/slow", "query_string": b"",
+                     "headers": [], "root_path": "", "scheme": "http", "server": ("test", 80), "http_version": "1.1"}
+            await guarded_app(scope, receive, send)
+            return sent
+
+        before = DB_QUERIES_CANCELLED.labels("default")._value.get()
+        began = time.monotonic()
+        sent = asyncio.run(call())
+        assert time.monotonic() - began < 10
+        assert sent[0]["status"] == 504
+        assert DB_QUERIES_CANCELLED.labels("default")._value.get() == before + 1
+
+    def test_pool_timeout_is_503(self):
+        """Test that pool exhaustion sheds load with Retry-After"""
+        from fastapi import FastAPI
+        from sqlalchemy import exc as sa_exc
+        from app.core.db_timeouts import pool_timeout_handler
+
+        busy_app = FastAPI()
+        busy_app.add_exception_handler(sa_exc.TimeoutError, pool_timeout_handler)
+
+        @busy_app.get("/busy")
+        def busy():
+            raise sa_exc.TimeoutError("QueuePool limit reached")
+
+        response = TestClient(busy_app).get("/busy")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
+class TestRateLimits:
+    """Test per-caller, per-route-group token bucket rate limiting"""
+
+    def test_parse_limits(self):
+        """Test role defaults, group overrides and the role wildcard"""
+        from app.core.rate_limit import parse_limits
+
+        limits = parse_limits("anonymous=1/5,reporter=10/20", "reporter.list=2/4,*.upload=1")
+        assert limits[("reporter", "detail")] == (10, 20)
+        assert limits[("reporter", "list")] == (2, 4)
+        assert limits[("anonymous", "upload")] == limits[("admin", "upload")] == (1, 1)
+        assert limits[("admin", "list")] == (0, 0)
+        with pytest.raises(ValueError):
+            parse_limits("guest=1/5", "")
+        with pytest.raises(ValueError):
+            parse_limits("", "reporter.lists=1/5")
+
+    def test_bucket_refills_at_rate(self, monkeypatch):
+        """Test that a bucket allows its burst, then one request per refill interval"""
+        from app.core import rate_limit
+
+        now = [100.0]
+        monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+        buckets = rate_limit.MemoryBuckets()
+
+        assert [buckets.take("k", 2, 3) for _ in range(3)] == [0, 0, 0]
+        assert buckets.take("k", 2, 3) == pytest.approx(0.5)
+        now[0] += 0.5
+        assert buckets.take("k", 2, 3) == 0
+        assert buckets.take("other", 2, 3) == 0
+
+    def test_memory_buckets_stay_bounded(self, monkeypatch):
+        """Test that allowed requests from many callers cannot grow the bucket map without bound"""
+        from app.core import rate_limit
+
+        now = [100.0]
+        monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+        buckets = rate_limit.MemoryBuckets(max_keys=1000)
+
+        for n in range(50_000):
+            assert buckets.take(f"ip:{n}", 1, 5) == 0
+        assert len(buckets) == 1000
+
+        now[0] += 10  # every bucket has refilled
+        buckets.take("ip:new", 1, 5)
+        assert len(buckets) == 1
+
+    def test_anonymous_callers_behind_trusted_proxies(self):
+        """Test that X-Forwarded-For is only believed from trusted proxies"""
+        from starlette.datastructures import Headers
+        from app.core.rate_limit import caller
+        from app.core.request_identity import parse_networks
+
+        proxies = parse_networks(["10.0.0.0/8"])
+        forwarded = Headers(raw=[(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7, 10.0.0.2")])
+        assert caller({"client": ("10.0.0.1", 1)}, forwarded, proxies) == ("ip:203.0.113.7", "anonymous")
+        assert caller({"client": ("198.51.100.1", 1)}, forwarded, proxies) == ("ip:198.51.100.1", "anonymous")
+        assert caller({"client": ("10.0.0.1", 1)}, forwarded, []) == ("ip:10.0.0.1", "anonymous")
+
+    def test_over_limit_is_429_per_caller_and_group(self):
+        """Test that a caller over its bucket gets 429 with Retry-After, without affecting others"""
+        from fastapi import FastAPI
+        from app.core.rate_limit import MemoryBuckets, RateLimiter, RateLimitMiddleware, parse_limits
+
+        limited_app = FastAPI()
+        limiter = RateLimiter(MemoryBuckets(), parse_limits("anonymous=0.1/2,reporter=0.1/2", ""))
+        limited_app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+        @limited_app.get("/issues/")
+        def issues():
+            return []
+
+        @limited_app.get("/issues/{issue_id}")
+        def issue(issue_id: int):
+            return {}
+
+        limited = TestClient(limited_app)
+        assert [limited.get("/issues/").status_code for _ in range(2)] == [200, 200]
+        response = limited.get("/issues/")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "10"
+        assert limited.get("/issues/1").status_code == 200
+        assert limited.get("/issues/", headers=auth_headers("reporter")).status_code == 200
+
+class TestBulkheads:
+    """Test per-route-group concurrency caps and threadpool sizing"""
+
+    def test_queue_then_reject(self):
+        """Test that excess requests queue, get handed a freed slot, and are rejected past the queue"""
+        import asyncio
+        from app.core.bulkheads import Bulkhead
+
+        async def scenario():
+            bulkhead = Bulkhead("upload", limit=1, max_queue=1, queue_timeout=0.2)
+            assert await bulkhead.acquire()
+            waiting = asyncio.create_task(bulkhead.acquire())
+            await asyncio.sleep(0)
+            assert not await bulkhead.acquire()  # queue full
+            bulkhead.release()
+            assert await waiting
+            assert bulkhead.stats() == {"limit": 1, "in_use": 1, "queued": 0}
+            assert not await bulkhead.acquire()  # times out
+            bulkhead.release()
+            assert bulkhead.stats()["in_use"] == 0
+
+        asyncio.run(scenario())
+
+    def test_saturated_group_is_503_and_others_proceed(self):
+        """Test that a full group rejects with Retry-After while other groups are unaffected"""
+        import asyncio
+        from fastapi import FastAPI
+        from app.core.bulkheads import BulkheadMiddleware, build_bulkheads
+
+        groups = build_bulkheads({"upload": 1, "detail": 0}, max_queue=0, queue_timeout=0.1)
+        assert list(groups) == ["upload"]
+        busy_app = FastAPI()
+        busy_app.add_middleware(BulkheadMiddleware, groups=groups)
+
+        @busy_app.post("/issues/")
+        def create():
+            return {}
+
+        @busy_app.get("/issues/{issue_id}")
+        def detail(issue_id: int):
+            return {}
+
+        busy = TestClient(busy_app)
+        assert busy.post("/issues/").status_code == 200
+        asyncio.run(groups["upload"].acquire())  # hold the only slot
+        response = busy.post("/issues/")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert busy.get("/issues/1").status_code == 200
+
+    def test_threadpool_size(self):
+        """Test that the sync threadpool is resized and reported"""
+        import anyio
+        from app.core.bulkheads import ThreadpoolStats
+
+        async def configure():
+            stats = ThreadpoolStats()
+            stats.configure(7)
+            return stats.stats()
+
+        assert anyio.run(configure) == {"size": 7, "in_use": 0, "waiting": 0}
+
+class TestArchive:
+    """Test the hot/cold split of long-closed issues"""
+
+    def test_archived_issues_stay_readable_and_counted(self, tmp_path):
+        """Test that archiving moves old done issues while reads, counters and the GC still see them"""
+        from datetime import datetime, timedelta
+        from pathlib import Path
+        from app.core import archive, counters
+        from sqlalchemy import event
+        from app.core.attachments import collect_orphans
+        from app.models.models import ArchiveCounter, ArchivedIssue, IssueSeverity, IssueStatus
+        from app.worker.tasks import aggregate_issue_counts
+
+        reporter = auth_headers("reporter")
+        old_id = client.post("/issues/", headers=reporter, data={"title": "Long done"}).json()["id"]
+        recent_id = client.post("/issues/", headers=reporter, data={"title": "Recently done"}).json()["id"]
+        open_id = client.post("/issues/", headers=reporter, data={"title": "Still open"}).json()["id"]
+        attachment = tmp_path / "archived.txt"
+        attachment.write_bytes(b"x")
+        os.utime(attachment, (0, 0))
+
+        db = TestingSessionLocal()
+        try:
+            for issue in db.query(Issue).filter(Issue.id.in_([old_id, recent_id])):
+                issue.status = IssueStatus.DONE
+            db.commit()
+            db.query(Issue).filter(Issue.id == old_id).update(
+                {"updated_at": datetime(2020, 1, 1), "file_path": str(attachment), "file_name": attachment.name},
+                synchronize_session=False,
+            )
+            db.commit()
+            owner_id = db.get(Issue, open_id).owner_id
+            before = counters.read_counters(db, owner_id)
+            etag = client.get(f"/issues/{old_id}", headers=reporter).headers["etag"]
+
+            moved = archive.archive_batch(db, datetime.utcnow() - timedelta(days=90), batch_size=10)
+            db.commit()
+            assert moved == [(old_id, owner_id)]
+            assert db.get(Issue, old_id) is None
+            assert db.get(ArchivedIssue, old_id).archived_at is not None
+
+            assert counters.read_counters(db, owner_id, table=ArchiveCounter) == {(IssueStatus.DONE, IssueSeverity.MEDIUM): 1}
+            assert counters.reconcile_counters(db) == 0
+            db.commit()
+            assert counters.read_counters(db, owner_id) == before
+            assert collect_orphans(db, Path(tmp_path), grace_seconds=0)["deleted"] == 0
+
+            # Daily stats count the archived issue from the archive totals, without scanning the archive
+            statements = []
+            listen = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(engine, "before_cursor_execute", listen)
+            try:
+                counts = aggregate_issue_counts(db)
+            finally:
+                event.remove(engine, "before_cursor_execute", listen)
+            assert counts["total_count"] == db.query(Issue).count() + db.query(ArchivedIssue).count()
+            assert not any("issues_archive" in statement for statement in statements)
+        finally:
+            db.close()
+
+        response = client.get(f"/issues/{old_id}", headers=reporter)
+        assert response.status_code == 200
+        assert response.json()["title"] == "Long done"
+        assert response.headers["etag"] == etag
+        assert [i["id"] for i in client.get("/issues/", headers=reporter).json()] == [recent_id, open_id]
+        listed = client.get("/issues/?include_archived=true&fields=id,owner", headers=reporter).json()
+        assert [i["id"] for i in listed] == [old_id, recent_id, open_id]
+        assert listed[0]["owner"]["id"] == owner_id
+        assert client.get("/issues/dashboard/stats", headers=reporter).json()["total_issues"] == 3
+
+class TestWorkerRuntime:
+    """Test the Celery worker's per-process engine and task sessions"""
+
+    def test_task_session_rolls_back_and_returns_connection(self, monkeypatch):
+        """Test that a failing task body leaves nothing written and no connection checked out"""
+        from app.worker import runtime
+
+        monkeypatch.setattr(runtime, "SessionLocal", TestingSessionLocal)
+        checked_out = engine.pool.checkedout()
+        with pytest.raises(RuntimeError):
+            with runtime.task_session() as db:
+                db.add(Issue(title="Never committed", owner_id=1))
+                db.flush()
+                raise RuntimeError("task failed")
+
+        assert engine.pool.checkedout() == checked_out
+        db = TestingSessionLocal()
+        try:
+            assert db.query(Issue).filter(Issue.title == "Never committed").count() == 0
+        finally:
+            db.close()
+
+    def test_forked_process_gets_its_own_pool(self, tmp_path, monkeypatch):
+        """Test that process init rebinds task sessions to a fresh, small pool"""
+        from app.core import config
+        from app.worker import runtime
+
+        parent = create_engine(f"sqlite:///{tmp_path}/parent.db")
+        sessions = sessionmaker(bind=parent)
+        monkeypatch.setattr(runtime, "engine", parent)
+        monkeypatch.setattr(runtime, "SessionLocal", sessions)
+
+        runtime.init_process()
+        try:
+            child = sessions().get_bind()
+            assert child is not parent
+            assert child.url == parent.url
+            assert child.pool.size() == config.WORKER_DB_POOL_SIZE
+        finally:
+            runtime.shutdown_process()
+        assert runtime._process_engine is None
+
 class TestAPI:
     """Test general API functionality"""
     